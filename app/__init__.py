@@ -1,13 +1,28 @@
 from flask import Flask
 
 from app.blueprints.commands import commands
-from app.blueprints.main import main
+from app.blueprints.main import PAGE_DEPENDS_ON, main
+from app.cache import create_result_cache
+from app.catalog import Catalog
+from app.changes import DataVersion
 from app.config import Config
-from app.extensions import create_async_session, db
+from app.encoding import FastJSONProvider
+from app.extensions import (
+    ReplicaRouter,
+    create_async_db_engine,
+    create_async_session,
+    create_read_session,
+    db,
+    warm_up_engine,
+)
+from app.instrumentation import QueryMonitor
+from app.search import create_search_backend
+from app.typeahead import Typeahead
 
 
 def create_app():
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
     app.config.from_object(Config)
 
     register_extensions(app)
@@ -24,6 +39,44 @@ def register_blueprints(app: Flask):
 def register_extensions(app: Flask):
     db.init_app(app)
     with app.app_context():
-        db.Session = create_async_session(db.engine.url)
+        db.async_engine = create_async_db_engine(
+            db.engine.url,
+            app.config["DATABASE_ENGINE_OPTIONS"],
+            app.config["SQLITE_PRAGMAS"],
+        )
+        replicas = [
+            create_async_db_engine(
+                url,
+                app.config["DATABASE_ENGINE_OPTIONS"],
+                {**app.config["SQLITE_PRAGMAS"], "query_only": "ON"},
+            )
+            for url in app.config["DATABASE_REPLICA_URLS"]
+        ]
+        db.router = ReplicaRouter(
+            db.async_engine, replicas, app.config["REPLICA_STRATEGY"]
+        )
+        db.monitor = QueryMonitor(
+            app.config["SLOW_QUERY_THRESHOLD"], app.config["N_PLUS_ONE_THRESHOLD"]
+        )
+        for engine in db.router.engines:
+            db.monitor.instrument(engine)
+            warm_up_engine(engine)
+        db.monitor.init_app(app)
+        db.Session = create_async_session(db.async_engine)
+        db.ReadSession = create_read_session(db.router)
+        db.search = create_search_backend(db.engine.dialect.name)
+        db.cache = create_result_cache(
+            db.engine.dialect,
+            app.config["RESULT_CACHE_BACKEND"],
+            maxsize=app.config["RESULT_CACHE_SIZE"],
+            ttl=app.config["RESULT_CACHE_TTL"],
+        )
+        db.order_version = DataVersion(PAGE_DEPENDS_ON, app.config["RESULT_CACHE_TTL"])
+        db.catalog = Catalog(app.config["CATALOG_TTL"])
+        db.catalog.warm()
+        db.typeahead = Typeahead(app.config["TYPEAHEAD_TTL"])
+        db.typeahead.warm()
     # or configure as below
-    # db.Session = create_session(app.config.get("SQLALCHEMY_DATABASE_URI"))
+    # db.Session = create_async_session(
+    #     create_async_db_engine(app.config.get("SQLALCHEMY_DATABASE_URI"))
+    # )
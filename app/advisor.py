@@ -0,0 +1,287 @@
+import re
+from datetime import date
+from uuid import UUID
+
+from sqlalchemy import Column, event, inspect
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.dml import Insert
+from sqlalchemy.sql.elements import BinaryExpression, UnaryExpression
+
+from app.extensions import db
+from app.instrumentation import explain
+from app.models import (
+    ORDER_SORT_COLUMNS,
+    ArticleDailyViews,
+    Order,
+    Product,
+    ProductDailyViews,
+)
+from app.projections import order_items, order_rows
+from app.rollups import VIEW_ROLLUPS, rollup_views, trending
+from app.sales import SALES_DIMENSIONS, SALES_GRAINS, sales, top_customers
+
+FULL_SCAN = {
+    "sqlite": re.compile(r"^SCAN (\w+)$"),
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+}
+TEMP_SORT = {
+    "sqlite": re.compile(r"USE TEMP B-TREE FOR (?:RIGHT PART OF )?(ORDER|GROUP) BY"),
+    "postgresql": re.compile(r"^\s*(?:->\s*)?(Sort|HashAggregate|GroupAggregate)\b"),
+}
+COMPARISONS = {
+    operators.eq,
+    operators.ne,
+    operators.lt,
+    operators.le,
+    operators.gt,
+    operators.ge,
+    operators.in_op,
+    operators.between_op,
+    operators.like_op,
+}
+COVERING_COLUMNS = 4
+
+
+def registered_queries(dialect_name):
+    """Yield the name, statement and parameters of the queries the
+    application runs on every request or rollup, with sample parameters."""
+    for sort in [None] + [f"{d}{c}" for c in ORDER_SORT_COLUMNS for d in "+-"]:
+        for search in (None, "a"):
+            name = f"orders sort={sort or '-'} search={search or '-'}"
+            yield name, *Order.total_orders(search)
+            yield name, *paginated(0, 10, sort, search)
+            yield f"{name} cursor", *paginated(None, 10, sort, search, "")
+    for name, value in (("customer", UUID(int=0)), ("product", 1)):
+        yield f"orders {name}", *Order.total_orders(None, **{name: value})
+        yield f"orders {name}", *paginated(0, 10, None, None, **{name: value})
+    yield "order items", order_items([UUID(int=0)]), {}
+    for descending in (True, False):
+        yield f"products by rating desc={descending}", Product.by_rating(
+            0, 20, descending
+        ), {}
+    today = date.today()
+    for model in (ArticleDailyViews, ProductDailyViews):
+        yield f"trending {model.__tablename__}", trending(model, today, today, 10), {}
+    for grain in SALES_GRAINS:
+        for by in (None, *SALES_DIMENSIONS):
+            yield f"sales {grain} by={by or '-'}", sales(grain, today, today, by), {}
+    yield "top customers", top_customers(10), {}
+    for model, key in VIEW_ROLLUPS.items():
+        statement = rollup_views(dialect_name, model, key, 0, 0)
+        yield f"rollup {model.__tablename__}", statement, {}
+
+
+def paginated(start, length, sort, search, cursor=None, **filters):
+    statement, params = Order.paginated_orders(
+        start, length, sort, search, cursor, **filters
+    )
+    return order_rows(statement), params
+
+
+async def explain_query(connection, statement, params):
+    """Return the plan of ``statement`` as lines of text.
+
+    The plan is taken right before the statement runs, with the parameters
+    it is really run with, and anything the statement changes is rolled
+    back.
+    """
+    plans = []
+
+    def capture(conn, cursor, sql, parameters, context, executemany):
+        plans.append(explain(conn, sql, parameters))
+
+    sync_connection = connection.sync_connection
+    event.listen(sync_connection, "before_cursor_execute", capture)
+    try:
+        await connection.execute(statement, params)
+    finally:
+        await connection.rollback()
+        event.remove(sync_connection, "before_cursor_execute", capture)
+    return [
+        " | ".join(map(str, row[3:])) if len(row) > 3 else str(row[0])
+        for row in plans[0] or []
+    ]
+
+
+def plan_findings(dialect_name, plan):
+    """Return the full table scans and temporary sorts found in ``plan``."""
+    tables = db.Model.metadata.tables
+    scans, sorts = [], []
+    for line in plan:
+        match = FULL_SCAN[dialect_name].search(line)
+        if match and match.group(1) in tables:
+            scans.append(match.group(1))
+        match = TEMP_SORT[dialect_name].search(line)
+        if match:
+            sorts.append(match.group(1).upper().replace("SORT", "ORDER"))
+    return scans, sorts
+
+
+def statement_selects(statement):
+    if isinstance(statement, Insert) and statement.select is not None:
+        statement = statement.select
+    return [
+        element
+        for element in visitors.iterate(statement)
+        if element.__visit_name__ == "select"
+    ]
+
+
+def filtered_columns(statement, table):
+    """Return the columns of ``table`` compared in the WHERE clauses of the
+    statement, in the order they appear."""
+    columns = {}
+    for select in statement_selects(statement):
+        if select.whereclause is None:
+            continue
+        for element in visitors.iterate(select.whereclause):
+            if not isinstance(element, BinaryExpression):
+                continue
+            if element.operator not in COMPARISONS:
+                continue
+            for side in (element.left, element.right):
+                if isinstance(side, Column) and side.table is table:
+                    columns.setdefault(side.name)
+    return list(columns)
+
+
+def selected_columns(statement, table):
+    columns = {}
+    for select in statement_selects(statement):
+        for column in select.selected_columns:
+            column = getattr(column, "element", column)
+            if isinstance(column, Column) and column.table is table:
+                columns.setdefault(column.name)
+    return list(columns)
+
+
+def sort_columns(statement, clause):
+    """Return the table and column names of an ORDER BY or GROUP BY clause
+    if all its expressions are columns of one table."""
+    for select in statement_selects(statement):
+        keys = (
+            select._order_by_clauses if clause == "ORDER" else select._group_by_clauses
+        )
+        columns = []
+        for key in keys:
+            if isinstance(key, UnaryExpression):
+                key = key.element
+            key = getattr(key, "element", key)
+            if (
+                not isinstance(key, Column)
+                or key.table.name not in db.Model.metadata.tables
+            ):
+                columns = None
+                break
+            columns.append(key)
+        if columns and len({column.table for column in columns}) == 1:
+            return columns[0].table.name, [column.name for column in columns]
+    return None
+
+
+def suggest(statement, scans, sorts):
+    """Return the ``(table, columns)`` indexes that would avoid the scans
+    and sorts found in the plan of ``statement``."""
+    tables = db.Model.metadata.tables
+    suggestions = []
+    for name in scans:
+        table = tables[name]
+        columns = filtered_columns(statement, table)
+        if not columns:
+            continue
+        covering = columns + [
+            column
+            for column in selected_columns(statement, table)
+            if column not in columns
+        ]
+        if len(covering) <= COVERING_COLUMNS:
+            columns = covering
+        suggestions.append((name, columns))
+    for clause in sorts:
+        columns = sort_columns(statement, clause)
+        if columns is not None:
+            suggestions.append(columns)
+    return suggestions
+
+
+def existing_indexes(sync_connection):
+    """Return the column lists of the primary keys, unique constraints and
+    indexes of every table, both declared and found in the database."""
+    inspector = inspect(sync_connection)
+    indexes = {}
+    for table in db.Model.metadata.sorted_tables:
+        found = indexes.setdefault(table.name, [])
+        for constraint in table.constraints:
+            found.append([column.name for column in getattr(constraint, "columns", [])])
+        for index in table.indexes:
+            found.append([column.name for column in index.columns])
+        if inspector.has_table(table.name):
+            for index in inspector.get_indexes(table.name):
+                found.append(index["column_names"])
+    return indexes
+
+
+def is_indexed(indexes, table, columns):
+    return any(
+        index[: len(columns)] == columns for index in indexes.get(table, []) if index
+    )
+
+
+async def advise(connection):
+    """Explain every registered query and return a report per query, with
+    the indexes suggested to avoid full scans and temporary sorts."""
+    dialect_name = connection.dialect.name
+    if dialect_name not in FULL_SCAN:
+        raise ValueError(f"Index advice is not available for {dialect_name}")
+    indexes = await connection.run_sync(existing_indexes)
+    reports = []
+    for name, statement, params in registered_queries(dialect_name):
+        plan = await explain_query(connection, statement, params)
+        scans, sorts = plan_findings(dialect_name, plan)
+        suggestions = []
+        for table, columns in suggest(statement, scans, sorts):
+            if not is_indexed(indexes, table, columns):
+                suggestions.append((table, columns))
+        reports.append(
+            {
+                "name": name,
+                "plan": plan,
+                "scans": scans,
+                "sorts": sorts,
+                "suggestions": suggestions,
+            }
+        )
+    return reports
+
+
+def index_name(table, columns):
+    return f"ix_{table}_{'_'.join(columns)}"
+
+
+def write_revision(suggestions, message):
+    """Generate an Alembic revision creating the suggested indexes and
+    return its path."""
+    from alembic.autogenerate import render_python_code
+    from alembic.config import Config
+    from alembic.operations import ops
+    from alembic.script import ScriptDirectory
+    from alembic.util import rev_id
+    from sqlalchemy.sql.elements import conv
+
+    create = [
+        ops.CreateIndexOp(conv(index_name(table, columns)), table, columns)
+        for table, columns in suggestions
+    ]
+    drop = [
+        ops.DropIndexOp(conv(index_name(table, columns)), table_name=table)
+        for table, columns in reversed(suggestions)
+    ]
+    script = ScriptDirectory.from_config(Config("alembic.ini"))
+    revision = script.generate_revision(
+        rev_id(),
+        message,
+        head="head",
+        upgrades=render_python_code(ops.UpgradeOps(create)),
+        downgrades=render_python_code(ops.DowngradeOps(drop)),
+    )
+    return revision.path
@@ -1,15 +1,24 @@
 import asyncio
 import csv
+import multiprocessing
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from functools import wraps
-from uuid import UUID
+from functools import partial, wraps
+from uuid import UUID, uuid4
 
-from flask import Blueprint
-from sqlalchemy import delete
-from sqlalchemy.ext.asyncio import create_async_engine
+import click
+from flask import Blueprint, current_app
+from sqlalchemy import delete, func, insert, make_url, update
 
+from app.advisor import advise, write_revision
+from app.export import MIMETYPES, export_orders, export_query
 from app.extensions import db
+from app.imports import IncrementalImport
+from app.loading import loading
 from app.models import (
+    RATINGS,
     BlogArticle,
     BlogAuthor,
     BlogSession,
@@ -17,6 +26,7 @@ from app.models import (
     BlogView,
     Country,
     Customer,
+    ImportCheckpoint,
     Language,
     Manufacturer,
     Order,
@@ -25,6 +35,28 @@ from app.models import (
     ProductCountry,
     ProductReview,
 )
+from app.pipeline import (
+    Progress,
+    parse_orders,
+    parse_reviews,
+    parse_views,
+    run_pipeline,
+)
+from app.resolver import KeyResolver
+from app.rollups import clear_view_rollups, refresh_view_rollups
+from app.sales import rebuild_sales_rollups
+from app.synthetic import (
+    BLOG_USERS,
+    CUSTOMERS,
+    ORIGINAL_ARTICLES,
+    Profile,
+    article_chunk,
+    blog_user_chunk,
+    chunks,
+    customer_chunk,
+    generate,
+    init_worker,
+)
 
 commands = Blueprint("commands", __name__, cli_group=None)
 
@@ -37,17 +69,201 @@ def async_command(f):
     return wrapper
 
 
+async def insert_batches(session, table, rows, batch_size):
+    for i in range(0, len(rows), batch_size):
+        await session.execute(insert(table), rows[i : i + batch_size])
+
+
 @commands.cli.command()
 @async_command
 async def initdb():
     """Create database."""
-    engine = create_async_engine(db.engine.url)
-    async with engine.begin() as con:
+    async with db.async_engine.begin() as con:
         await con.run_sync(db.Model.metadata.drop_all)
         await con.run_sync(db.Model.metadata.create_all)
     print("Database created.")
 
 
+@commands.cli.command("db-advise")
+@click.option("--revision", is_flag=True, help="Write a migration with the indexes.")
+@click.option("--verbose", is_flag=True, help="Print the plan of every query.")
+def db_advise(revision, verbose):
+    """Explain the application's queries and suggest indexes."""
+
+    async def run():
+        async with db.async_engine.connect() as connection:
+            return await advise(connection)
+
+    try:
+        reports = asyncio.run(run())
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    suggestions = {}
+    for report in reports:
+        if not (report["scans"] or report["sorts"] or verbose):
+            continue
+        print(report["name"])
+        if verbose:
+            for line in report["plan"]:
+                print(f"    {line}")
+        for table in report["scans"]:
+            print(f"  full scan of {table}")
+        for clause in report["sorts"]:
+            print(f"  temporary B-tree for {clause} BY")
+        for table, columns in report["suggestions"]:
+            print(f"  suggested index on {table} ({', '.join(columns)})")
+            suggestions.setdefault((table, tuple(columns)), None)
+
+    if not suggestions:
+        print("No indexes to suggest.")
+    elif revision:
+        path = write_revision(
+            [(table, list(columns)) for table, columns in suggestions],
+            "advised indexes",
+        )
+        print(f"Migration written to {path}.")
+
+
+@commands.cli.command("sync-replicas")
+def sync_replicas():
+    """Copy the SQLite database to its read-only replica files."""
+    urls = [make_url(url) for url in current_app.config["DATABASE_REPLICA_URLS"]]
+    if not urls:
+        raise click.ClickException("No DATABASE_REPLICA_URLS configured.")
+    if any(url.get_backend_name() != "sqlite" for url in [db.async_engine.url, *urls]):
+        raise click.ClickException("Replicas can only be copied between SQLite files.")
+    primary = sqlite3.connect(db.async_engine.url.database)
+    try:
+        for url in urls:
+            replica = sqlite3.connect(url.database)
+            try:
+                primary.backup(replica)
+            finally:
+                replica.close()
+            print(f"Copied to {url.database}.")
+    finally:
+        primary.close()
+
+
+@commands.cli.group()
+def backfill():
+    """Recompute denormalized data."""
+    pass
+
+
+@backfill.command()
+@async_command
+async def totals():
+    """Recompute stored order totals and item counts."""
+    items = db.select(OrderItem).where(OrderItem.order_id == Order.id)
+    total = func.coalesce(func.sum(OrderItem.quantity * OrderItem.unit_price), 0)
+    async with db.Session() as session:
+        await session.execute(
+            update(Order).values(
+                total=items.with_only_columns(total).scalar_subquery(),
+                item_count=items.with_only_columns(func.count()).scalar_subquery(),
+            ),
+            execution_options={"synchronize_session": False},
+        )
+        await session.commit()
+    print("Order totals updated.")
+
+
+@backfill.command()
+@async_command
+async def ratings():
+    """Recompute stored product rating counts, sums and histograms."""
+    reviews = db.select(ProductReview).where(ProductReview.product_id == Product.id)
+
+    def aggregate(value):
+        return reviews.with_only_columns(value).scalar_subquery()
+
+    async with db.Session() as session:
+        await session.execute(
+            update(Product).values(
+                rating_count=aggregate(func.count()),
+                rating_sum=aggregate(func.coalesce(func.sum(ProductReview.rating), 0)),
+                rating_average=aggregate(func.avg(ProductReview.rating)),
+                **{
+                    f"rating_{n}": aggregate(
+                        func.count().filter(ProductReview.rating == n)
+                    )
+                    for n in RATINGS
+                },
+            ),
+            execution_options={"synchronize_session": False},
+        )
+        await session.commit()
+    print("Product ratings updated.")
+
+
+@backfill.command()
+@async_command
+async def search():
+    """Rebuild the order search index."""
+    async with db.Session() as session:
+        await db.search.rebuild(session)
+        await session.commit()
+    print("Search index rebuilt.")
+
+
+@commands.cli.group()
+def export():
+    """Export data."""
+    pass
+
+
+@export.command("orders")
+@click.option(
+    "--format", type=click.Choice(list(MIMETYPES)), default="ndjson", show_default=True
+)
+@click.option("--sort", help="Sort order, as in /api/orders.")
+@click.option("--search", help="Search text, as in /api/orders.")
+@click.option("--customer", help="Customer id, as in /api/orders.")
+@click.option("--product", help="Product id, as in /api/orders.")
+@click.option("--chunk-size", default=1000, show_default=True)
+@click.option("--output", type=click.File("w"), default="-")
+@async_command
+async def export_orders_command(
+    format, sort, search, customer, product, chunk_size, output
+):
+    """Export orders as NDJSON or CSV."""
+    try:
+        query, params = export_query(sort, search, customer, product)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    dumps = partial(current_app.json.dumps, separators=(",", ":"))
+    async for chunk in export_orders(query, params, format, dumps, chunk_size):
+        output.write(chunk)
+
+
+@commands.cli.group()
+def rollup():
+    """Maintain rollup tables."""
+    pass
+
+
+@rollup.command("views")
+@click.option("--full", is_flag=True, help="Rebuild the rollups from all views.")
+@async_command
+async def rollup_views(full):
+    """Add new blog views to the daily view rollups."""
+    async with db.Session() as session:
+        count = await refresh_view_rollups(session, full)
+        await session.commit()
+    print(f"{count} views rolled up.")
+
+
+@rollup.command("sales")
+@async_command
+async def rollup_sales():
+    """Rebuild the sales rollups from all orders."""
+    async with db.Session() as session:
+        await rebuild_sales_rollups(session)
+        await session.commit()
+    print("Sales rollups rebuilt.")
+
+
 @commands.cli.group()
 def fake():
     """Generate fake data."""
@@ -55,134 +271,251 @@ def fake():
 
 
 @fake.command()
+@click.option("--bulk", is_flag=True, help="Insert rows in batches without the ORM.")
+@click.option(
+    "--incremental", is_flag=True, help="Upsert new or changed rows since the last run."
+)
+@click.option("--batch-size", default=1000, show_default=True)
 @async_command
-async def products():
+async def products(bulk, incremental, batch_size):
     """Generate products data."""
+    if incremental:
+        return await incremental_import("products", batch_size)
     async with db.Session() as session:
+        await reset_checkpoints(session, "products")
         await session.execute(delete(ProductCountry))
         await session.execute(delete(Product))
         await session.execute(delete(Manufacturer))
         await session.execute(delete(Country))
 
-        with open("./data/products.csv") as f:
-            reader = csv.DictReader(f)
-            all_manufacturers = {}
-            all_countries = {}
+        if bulk:
+            await bulk_products(session, batch_size)
+        else:
+            with open("./data/products.csv") as f:
+                reader = csv.DictReader(f)
+                all_manufacturers = {}
+                all_countries = {}
 
-            for row in reader:
-                row["year"] = int(row["year"])
-                manufacturer = row.pop("manufacturer")
-                countries = row.pop("country").split("/")
-                p = Product(**row)
+                for row in reader:
+                    row["year"] = int(row["year"])
+                    manufacturer = row.pop("manufacturer")
+                    countries = row.pop("country").split("/")
+                    p = Product(**row)
 
-                if manufacturer not in all_manufacturers:
-                    m = Manufacturer(name=manufacturer)
-                    session.add(m)
-                    all_manufacturers[manufacturer] = m
+                    if manufacturer not in all_manufacturers:
+                        m = Manufacturer(name=manufacturer)
+                        session.add(m)
+                        all_manufacturers[manufacturer] = m
 
-                all_manufacturers[manufacturer].products.append(p)
+                    all_manufacturers[manufacturer].products.append(p)
 
-                for country in countries:
-                    if country not in all_countries:
-                        c = Country(name=country)
-                        session.add(c)
-                        all_countries[country] = c
-                    all_countries[country].products.append(p)
+                    for country in countries:
+                        if country not in all_countries:
+                            c = Country(name=country)
+                            session.add(c)
+                            all_countries[country] = c
+                        all_countries[country].products.append(p)
 
-            await session.commit()
+        await session.commit()
 
     print("Products data created.")
 
 
+async def bulk_products(session, batch_size):
+    manufacturers = {}
+    countries = {}
+    products = []
+    product_countries = []
+
+    with open("./data/products.csv") as f:
+        for product_id, row in enumerate(csv.DictReader(f), 1):
+            manufacturer_id = manufacturers.setdefault(
+                row["manufacturer"], len(manufacturers) + 1
+            )
+            products.append(
+                {
+                    "id": product_id,
+                    "name": row["name"],
+                    "manufacturer_id": manufacturer_id,
+                    "year": int(row["year"]),
+                    "cpu": row["cpu"],
+                }
+            )
+            for country in row["country"].split("/"):
+                country_id = countries.setdefault(country, len(countries) + 1)
+                product_countries.append(
+                    {"product_id": product_id, "country_id": country_id}
+                )
+
+    await insert_batches(
+        session,
+        Manufacturer.__table__,
+        [{"id": id, "name": name} for name, id in manufacturers.items()],
+        batch_size,
+    )
+    await insert_batches(
+        session,
+        Country.__table__,
+        [{"id": id, "name": name} for name, id in countries.items()],
+        batch_size,
+    )
+    await insert_batches(session, Product.__table__, products, batch_size)
+    await insert_batches(session, ProductCountry, product_countries, batch_size)
+
+
 @fake.command()
+@click.option("--bulk", is_flag=True, help="Insert rows in batches without the ORM.")
+@click.option(
+    "--incremental", is_flag=True, help="Upsert new or changed rows since the last run."
+)
+@click.option("--batch-size", default=1000, show_default=True)
+@click.option("--workers", type=int, help="Parser processes, one per CPU by default.")
+@click.option(
+    "--chunk-size", default=5000, show_default=True, help="CSV lines parsed per task."
+)
 @async_command
-async def orders():
+async def orders(bulk, incremental, batch_size, workers, chunk_size):
     """Generate orders data."""
+    if incremental:
+        return await incremental_import("orders", batch_size)
     async with db.Session() as session:
+        await reset_checkpoints(session, "orders")
         await session.execute(delete(OrderItem))
         await session.execute(delete(Order))
         await session.execute(delete(Customer))
 
-        all_customers = {}
-        all_products = {}
-
-        with open("./data/orders.csv") as f:
-            reader = csv.DictReader(f)
+        if bulk:
+            await bulk_orders(session, batch_size, workers, chunk_size)
+        else:
+            all_customers = {}
+            all_products = {}
 
-            for row in reader:
-                if row["name"] not in all_customers:
-                    c = Customer(
-                        name=row["name"], address=row["address"], phone=row["phone"]
-                    )
-                    all_customers[row["name"]] = c
-                o = Order(
-                    timestamp=datetime.strptime(row["timestamp"], "%Y-%m-%d %H:%M:%S")
-                )
-                all_customers[row["name"]].orders.add(o)
-                session.add(o)
+            with open("./data/orders.csv") as f:
+                reader = csv.DictReader(f)
 
-                product = all_products.get(row["product1"])
-                if product is None:
-                    product = await session.scalar(
-                        db.select(Product).filter_by(name=row["product1"])
-                    )
-                    all_products[row["product1"]] = product
-                o.order_items.append(
-                    OrderItem(
-                        product=product,
-                        unit_price=float(row["unit_price1"]),
-                        quantity=int(row["quantity1"]),
+                for row in reader:
+                    if row["name"] not in all_customers:
+                        c = Customer(
+                            name=row["name"], address=row["address"], phone=row["phone"]
+                        )
+                        all_customers[row["name"]] = c
+                    o = Order(
+                        timestamp=datetime.strptime(
+                            row["timestamp"], "%Y-%m-%d %H:%M:%S"
+                        )
                     )
-                )
+                    all_customers[row["name"]].orders.add(o)
+                    session.add(o)
 
-                if row["product2"]:
-                    product = all_products.get(row["product2"])
+                    product = all_products.get(row["product1"])
                     if product is None:
                         product = await session.scalar(
-                            db.select(Product).filter_by(name=row["product2"])
+                            db.select(Product)
+                            .filter_by(name=row["product1"])
+                            .options(*loading("bulk_import"))
                         )
-                        all_products[row["product2"]] = product
+                        all_products[row["product1"]] = product
                     o.order_items.append(
                         OrderItem(
                             product=product,
-                            unit_price=float(row["unit_price2"]),
-                            quantity=int(row["quantity2"]),
+                            unit_price=float(row["unit_price1"]),
+                            quantity=int(row["quantity1"]),
                         )
                     )
 
-                if row["product3"]:
-                    product = all_products.get(row["product3"])
-                    if product is None:
-                        product = await session.scalar(
-                            db.select(Product).filter_by(name=row["product3"])
+                    if row["product2"]:
+                        product = all_products.get(row["product2"])
+                        if product is None:
+                            product = await session.scalar(
+                                db.select(Product)
+                                .filter_by(name=row["product2"])
+                                .options(*loading("bulk_import"))
+                            )
+                            all_products[row["product2"]] = product
+                        o.order_items.append(
+                            OrderItem(
+                                product=product,
+                                unit_price=float(row["unit_price2"]),
+                                quantity=int(row["quantity2"]),
+                            )
                         )
-                        all_products[row["product3"]] = product
-                    o.order_items.append(
-                        OrderItem(
-                            product=product,
-                            unit_price=float(row["unit_price3"]),
-                            quantity=int(row["quantity3"]),
+
+                    if row["product3"]:
+                        product = all_products.get(row["product3"])
+                        if product is None:
+                            product = await session.scalar(
+                                db.select(Product)
+                                .filter_by(name=row["product3"])
+                                .options(*loading("bulk_import"))
+                            )
+                            all_products[row["product3"]] = product
+                        o.order_items.append(
+                            OrderItem(
+                                product=product,
+                                unit_price=float(row["unit_price3"]),
+                                quantity=int(row["quantity3"]),
+                            )
                         )
-                    )
 
-            await session.commit()
+        await session.commit()
     print("Orders data created.")
 
 
+async def bulk_orders(session, batch_size, workers, chunk_size):
+    products = dict((await session.execute(db.select(Product.name, Product.id))).all())
+    all_customers = {}
+
+    async def write(rows):
+        customers = []
+        for name, customer in rows["customers"].items():
+            if name not in all_customers:
+                all_customers[name] = uuid4()
+                customers.append({"id": all_customers[name], "name": name, **customer})
+        for order in rows["orders"]:
+            order["customer_id"] = all_customers[order.pop("customer")]
+        for order_item in rows["order_items"]:
+            order_item["product_id"] = products[order_item.pop("product")]
+        await insert_batches(session, Customer.__table__, customers, batch_size)
+        await insert_batches(session, Order.__table__, rows["orders"], batch_size)
+        await insert_batches(
+            session, OrderItem.__table__, rows["order_items"], batch_size
+        )
+
+    await run_pipeline("./data/orders.csv", parse_orders, write, workers, chunk_size)
+
+
 @fake.command()
+@click.option("--bulk", is_flag=True, help="Insert rows in batches without the ORM.")
+@click.option(
+    "--incremental", is_flag=True, help="Upsert new or changed rows since the last run."
+)
+@click.option("--batch-size", default=1000, show_default=True)
+@click.option("--workers", type=int, help="Parser processes, one per CPU by default.")
+@click.option(
+    "--chunk-size", default=5000, show_default=True, help="CSV lines parsed per task."
+)
 @async_command
-async def reviews():
+async def reviews(bulk, incremental, batch_size, workers, chunk_size):
     """Generate reviews data."""
+    if incremental:
+        return await incremental_import("reviews", batch_size)
     async with db.Session() as session:
-        with open("./data/reviews.csv") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                c = await session.scalar(
-                    db.select(Customer).filter_by(name=row["customer"])
-                )
-                p = await session.scalar(
-                    db.select(Product).filter_by(name=row["product"])
-                )
+        await reset_checkpoints(session, "reviews")
+        resolver = KeyResolver(session)
+        await resolver.load(Product.name)
+
+        if bulk:
+            await bulk_reviews(session, resolver, batch_size, workers, chunk_size)
+        else:
+            with open("./data/reviews.csv") as f:
+                rows = list(csv.DictReader(f))
+            await resolver.load(Customer.name, {row["customer"] for row in rows})
+
+            for row in rows:
+                c = resolver.get(Customer.name, row["customer"])
+                p = resolver.get(Product.name, row["product"])
+                if c is None or p is None:
+                    continue
                 r = ProductReview(
                     customer=c,
                     product=p,
@@ -191,39 +524,63 @@ async def reviews():
                     comment=row["comment"] or None,
                 )
                 session.add(r)
-            await session.commit()
+        await session.commit()
+    resolver.report()
     print("Reviews data created.")
 
 
+async def bulk_reviews(session, resolver, batch_size, workers, chunk_size):
+    async def write(rows):
+        await resolver.load(Customer.name, {row["customer"] for row in rows})
+        reviews = []
+        for row in rows:
+            customer = resolver.get(Customer.name, row.pop("customer"))
+            product = resolver.get(Product.name, row.pop("product"))
+            if customer is None or product is None:
+                continue
+            reviews.append(
+                {**row, "customer_id": customer.id, "product_id": product.id}
+            )
+        await insert_batches(session, ProductReview.__table__, reviews, batch_size)
+
+    await run_pipeline("./data/reviews.csv", parse_reviews, write, workers, chunk_size)
+
+
 @fake.command()
+@click.option(
+    "--incremental", is_flag=True, help="Upsert new or changed rows since the last run."
+)
+@click.option("--batch-size", default=1000, show_default=True)
 @async_command
-async def articles():
+async def articles(incremental, batch_size):
     """Generate articles data."""
+    if incremental:
+        return await incremental_import("articles", batch_size)
     async with db.Session() as session:
+        await reset_checkpoints(session, "articles", "views")
+        await clear_view_rollups(session)
         await session.execute(delete(BlogView))
         await session.execute(delete(BlogSession))
         await session.execute(delete(BlogUser))
         await session.execute(delete(BlogArticle))
         await session.execute(delete(BlogAuthor))
 
+        resolver = KeyResolver(session)
+        await resolver.load(Product.name)
         all_authors = {}
-        all_products = {}
 
         with open("./data/articles.csv") as f:
             reader = csv.DictReader(f)
             for row in reader:
+                product = None
+                if row["product"]:
+                    product = resolver.get(Product.name, row["product"])
+                    if product is None:
+                        continue
                 author = all_authors.get(row["author"])
                 if author is None:
                     author = BlogAuthor(name=row["author"])
                     all_authors[author.name] = author
-                product = None
-                if row["product"]:
-                    product = all_products.get(row["product"])
-                    if product is None:
-                        product = await session.scalar(
-                            db.select(Product).filter_by(name=row["product"])
-                        )
-                        all_products[product.name] = product
                 article = BlogArticle(
                     title=row["title"],
                     author=author,
@@ -232,71 +589,131 @@ async def articles():
                 )
                 session.add(article)
             await session.commit()
+    resolver.report()
     print("Articles data created.")
 
 
 @fake.command()
+@click.option(
+    "--incremental", is_flag=True, help="Upsert new or changed rows since the last run."
+)
+@click.option("--bulk", is_flag=True, help="Insert rows in batches without the ORM.")
+@click.option("--batch-size", default=1000, show_default=True)
+@click.option("--workers", type=int, help="Parser processes, one per CPU by default.")
+@click.option(
+    "--chunk-size", default=5000, show_default=True, help="CSV lines parsed per task."
+)
 @async_command
-async def views():
+async def views(incremental, bulk, batch_size, workers, chunk_size):
     """Generate views data."""
+    if incremental:
+        return await incremental_import("views", batch_size)
     async with db.Session() as session:
+        await reset_checkpoints(session, "views")
+        await clear_view_rollups(session)
         await session.execute(delete(BlogView))
         await session.execute(delete(BlogSession))
         await session.execute(delete(BlogUser))
 
-        all_articles = {}
-        all_customers = {}
-        all_blog_users = {}
-        all_blog_sessions = {}
-
-        with open("./data/views.csv") as f:
-            reader = csv.DictReader(f)
-            i = 0
-            for row in reader:
-                user = all_blog_users.get(row["user"])
-                if user is None:
-                    customer = None
-                    if row["customer"]:
-                        customer = all_customers.get(row["customer"])
-                        if customer is None:
-                            customer = await session.scalar(
-                                db.select(Customer).filter_by(name=row["customer"])
-                            )
-                        all_customers[customer.name] = customer
-
-                    user_id = UUID(row["user"])
-                    user = BlogUser(id=user_id, customer=customer)
-                    session.add(user)
-                    all_blog_users[row["user"]] = user
-
-                blog_session = all_blog_sessions.get(row["session"])
-                if blog_session is None:
-                    session_id = UUID(row["session"])
-                    blog_session = BlogSession(id=session_id, user=user)
-                    session.add(blog_session)
-                    all_blog_sessions[row["session"]] = blog_session
-
-                article = all_articles.get(row["title"])
-                if article is None:
-                    article = await session.scalar(
-                        db.select(BlogArticle).filter_by(title=row["title"])
+        resolver = KeyResolver(session)
+        await resolver.load(BlogArticle.title)
+
+        if bulk:
+            await bulk_views(session, resolver, batch_size, workers, chunk_size)
+        else:
+            with open("./data/views.csv") as f:
+                customers = {row["customer"] for row in csv.DictReader(f)}
+            customers.discard("")
+            await resolver.load(Customer.name, customers)
+            all_blog_users = {}
+            all_blog_sessions = {}
+            progress = Progress()
+
+            with open("./data/views.csv") as f:
+                reader = csv.DictReader(f)
+                for row in reader:
+                    article = resolver.get(BlogArticle.title, row["title"])
+                    if article is None:
+                        continue
+
+                    user = all_blog_users.get(row["user"])
+                    if user is None:
+                        customer = None
+                        if row["customer"]:
+                            customer = resolver.get(Customer.name, row["customer"])
+                            if customer is None:
+                                continue
+
+                        user_id = UUID(row["user"])
+                        user = BlogUser(id=user_id, customer=customer)
+                        session.add(user)
+                        all_blog_users[row["user"]] = user
+
+                    blog_session = all_blog_sessions.get(row["session"])
+                    if blog_session is None:
+                        session_id = UUID(row["session"])
+                        blog_session = BlogSession(id=session_id, user=user)
+                        session.add(blog_session)
+                        all_blog_sessions[row["session"]] = blog_session
+
+                    view = BlogView(
+                        article=article,
+                        session=blog_session,
+                        timestamp=datetime.strptime(
+                            row["timestamp"], "%Y-%m-%d %H:%M:%S"
+                        ),
                     )
-                all_articles[article.title] = article
+                    session.add(view)
+
+                    progress.add(1)
+                    if progress.rows % 100 == 0:
+                        await session.commit()
+            progress.print()
+        await session.commit()
+    resolver.report()
+    print("Views data created.")
 
-                view = BlogView(
-                    article=article,
-                    session=blog_session,
-                    timestamp=datetime.strptime(row["timestamp"], "%Y-%m-%d %H:%M:%S"),
-                )
-                session.add(view)
 
-                i += 1
-                if i % 100 == 0:
-                    print(i)
-                    await session.commit()
-            print(i)
-            await session.commit()
-    print("Views data created.")
+async def bulk_views(session, resolver, batch_size, workers, chunk_size):
+    all_blog_users = set()
+    all_blog_sessions = set()
+
+    async def write(rows):
+        await resolver.load(Customer.name, {row["customer"] for row in rows} - {""})
+        blog_users = []
+        blog_sessions = []
+        views = []
+        for row in rows:
+            article = resolver.get(BlogArticle.title, row["title"])
+            if article is None:
+                continue
+
+            if row["user"] not in all_blog_users:
+                customer_id = None
+                if row["customer"]:
+                    customer = resolver.get(Customer.name, row["customer"])
+                    if customer is None:
+                        continue
+                    customer_id = customer.id
+                all_blog_users.add(row["user"])
+                blog_users.append({"id": row["user"], "customer_id": customer_id})
+
+            if row["session"] not in all_blog_sessions:
+                all_blog_sessions.add(row["session"])
+                blog_sessions.append({"id": row["session"], "user_id": row["user"]})
+
+            views.append(
+                {
+                    "article_id": article.id,
+                    "session_id": row["session"],
+                    "timestamp": row["timestamp"],
+                }
+            )
+        await insert_batches(session, BlogUser.__table__, blog_users, batch_size)
+        await insert_batches(session, BlogSession.__table__, blog_sessions, batch_size)
+        await insert_batches(session, BlogView.__table__, views, batch_size)
+
+    await run_pipeline("./data/views.csv", parse_views, write, workers, chunk_size)
 
 
 @fake.command()
@@ -304,40 +721,145 @@ async def views():
 async def languages():
     """Generate languages data."""
     async with db.Session() as session:
-        all_articles = {}
-        all_languages = {}
+        resolver = KeyResolver(session)
+        await resolver.load(BlogArticle.title)
+        await resolver.load(Language.name)
 
         with open("./data/articles.csv") as f:
             reader = csv.DictReader(f)
 
             for row in reader:
-                article = all_articles.get(row["title"])
+                article = resolver.get(BlogArticle.title, row["title"])
                 if article is None:
-                    article = await session.scalar(
-                        db.select(BlogArticle).filter_by(title=row["title"])
-                    )
-                    all_articles[article.title] = article
+                    continue
 
-                language = all_languages.get(row["language"])
+                language = resolver.get(Language.name, row["language"], required=False)
                 if language is None:
-                    language = await session.scalar(
-                        db.select(Language).filter_by(name=row["language"])
-                    )
-                    if language is None:
-                        language = Language(name=row["language"])
-                        session.add(language)
-                    all_languages[language.name] = language
+                    language = Language(name=row["language"])
+                    session.add(language)
+                    resolver.add(Language.name, language)
                 article.language = language
 
                 if row["translation_of"]:
-                    translation_of = all_articles.get(row["translation_of"])
+                    translation_of = resolver.get(
+                        BlogArticle.title, row["translation_of"]
+                    )
                     if translation_of is None:
-                        translation_of = await session.scalar(
-                            db.select(BlogArticle).filter_by(
-                                title=row["translation_of"]
-                            )
-                        )
-                        all_articles[article.title] = article
+                        continue
                     article.translation_of = translation_of
             await session.commit()
+    resolver.report()
     print("Languages data created.")
+
+
+async def incremental_import(name, batch_size):
+    async with db.Session() as session:
+        importer = IncrementalImport(session, batch_size)
+        read = await importer.run(
+            name, f"./data/{name}.csv", getattr(importer, f"load_{name}")
+        )
+    importer.report()
+    print(f"{read} rows read, {importer.written} rows inserted or updated.")
+
+
+async def reset_checkpoints(session, *names):
+    await session.execute(
+        delete(ImportCheckpoint).where(ImportCheckpoint.name.in_(names))
+    )
+
+
+async def insert_chunk(session, rows, batch_size):
+    for name, table_rows in rows.items():
+        await insert_batches(
+            session, db.Model.metadata.tables[name], table_rows, batch_size
+        )
+    await session.commit()
+
+
+def shift_ids(rows, authors, articles):
+    for author in rows["blog_author"]:
+        author["id"] += authors
+    for article in rows["blog_article"]:
+        article["id"] += articles
+        article["author_id"] += authors
+        if article["translation_of_id"]:
+            article["translation_of_id"] += articles
+
+
+@fake.command()
+@click.option(
+    "--factor", default=1.0, show_default=True, help="Multiple of the data/ volumes."
+)
+@click.option("--seed", default=0, show_default=True)
+@click.option(
+    "--workers", type=int, help="Generator processes, one per CPU by default."
+)
+@click.option(
+    "--chunk-size",
+    default=1000,
+    show_default=True,
+    help="Customers, articles or blog users generated per task.",
+)
+@click.option("--batch-size", default=1000, show_default=True)
+@async_command
+async def scale(factor, seed, workers, chunk_size, batch_size):
+    """Generate orders, reviews, articles and views at scale."""
+    workers = workers or os.cpu_count()
+    async with db.Session() as session:
+        products = dict(
+            (await session.execute(db.select(Product.name, Product.id))).all()
+        )
+        if not products:
+            raise click.ClickException("No products, run flask fake products first.")
+        profile = Profile("./data", products)
+
+        await reset_checkpoints(session, "orders", "reviews", "articles", "views")
+        await clear_view_rollups(session)
+        for model in [
+            BlogView,
+            BlogSession,
+            BlogUser,
+            BlogArticle,
+            BlogAuthor,
+            Language,
+            ProductReview,
+            OrderItem,
+            Order,
+            Customer,
+        ]:
+            await session.execute(delete(model))
+        await session.execute(
+            insert(Language),
+            [{"id": i, "name": name} for i, name in enumerate(profile.languages, 1)],
+        )
+        await session.commit()
+
+        customers = round(CUSTOMERS * factor)
+        originals = round(ORIGINAL_ARTICLES * factor)
+        authors = articles = 0
+        with ProcessPoolExecutor(
+            workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(profile,),
+        ) as executor:
+            window = workers * 2
+            ranges = chunks(customers, chunk_size)
+            for rows in generate(executor, window, customer_chunk, seed, ranges):
+                await insert_chunk(session, rows, batch_size)
+            print(f"{customers} customers created.")
+
+            ranges = chunks(originals, chunk_size)
+            for rows in generate(executor, window, article_chunk, seed, ranges):
+                shift_ids(rows, authors, articles)
+                authors += len(rows["blog_author"])
+                articles += len(rows["blog_article"])
+                await insert_chunk(session, rows, batch_size)
+            print(f"{articles} articles created.")
+
+            ranges = chunks(round(BLOG_USERS * factor), chunk_size)
+            for rows in generate(
+                executor, window, blog_user_chunk, seed, ranges, customers, articles
+            ):
+                await insert_chunk(session, rows, batch_size)
+    print("Scaled data created.")
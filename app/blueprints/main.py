@@ -1,29 +1,300 @@
-from flask import Blueprint, render_template, request
+from datetime import date, timedelta
+from functools import partial
 
+from flask import (
+    Blueprint,
+    abort,
+    current_app,
+    jsonify,
+    make_response,
+    render_template,
+    request,
+)
+
+from app.concurrency import gather, iterate
+from app.export import MIMETYPES, export_orders, export_query
 from app.extensions import db
-from app.models import Order
+from app.models import (
+    ArticleDailyViews,
+    BlogArticle,
+    Country,
+    Customer,
+    Manufacturer,
+    Order,
+    OrderItem,
+    Product,
+    ProductCountry,
+    ProductDailyViews,
+    ProductReview,
+)
+from app.projections import order_dicts, order_rows
+from app.rollups import trending
+from app.sales import SALES_DIMENSIONS, SALES_GRAINS, sales, top_customers
 
 main = Blueprint("main", __name__)
 
+LOCAL_ADDRESSES = {"127.0.0.1", "::1"}
+TOTAL_DEPENDS_ON = (Order, OrderItem, Customer, Product)
+PAGE_DEPENDS_ON = TOTAL_DEPENDS_ON + (
+    Manufacturer,
+    Country,
+    ProductCountry,
+    ProductReview,
+)
+
 
 @main.get("/")
 async def index():
     return render_template("index.html")
 
 
+async def count_orders(query, params):
+    async with db.ReadSession() as session:
+        return await session.scalar(query, params)
+
+
+async def load_orders(query, params, sort, length):
+    async with db.ReadSession() as session:
+        data, last = await order_dicts(session, query, params)
+    next_cursor = None
+    if last is not None and length and len(data) == int(length):
+        next_cursor = Order.next_cursor(sort, last)
+    return data, next_cursor
+
+
+def not_modified(etag):
+    response = make_response("", 304)
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+
 @main.get("/api/orders")
 async def get_orders():
     start = request.args.get("start")
     length = request.args.get("length")
     sort = request.args.get("sort")
     search = request.args.get("search")
+    cursor = request.args.get("cursor")
+    customer = request.args.get("customer")
+    product = request.args.get("product")
+
+    try:
+        total_query, total_params = Order.total_orders(search, customer, product)
+        order_query, order_params = Order.paginated_orders(
+            start, length, sort, search, cursor, customer, product
+        )
+    except ValueError as e:
+        abort(400, str(e))
+    order_query = order_rows(order_query)
+
+    # the data version only counts this process's commits, so writes made
+    # by other processes change the tag once its period runs out
+    query_key = db.cache.key(order_query, order_params)
+    etag = f"{db.order_version.tag}-{query_key[:16]}"
+    if request.if_none_match.contains(etag):
+        return not_modified(etag)
+
+    total, (data, next_cursor) = await gather(
+        db.cache.fetch(
+            total_query,
+            partial(count_orders, total_query, total_params),
+            TOTAL_DEPENDS_ON,
+            total_params,
+        ),
+        db.cache.fetch(
+            order_query,
+            partial(load_orders, order_query, order_params, sort, length),
+            PAGE_DEPENDS_ON,
+            order_params,
+        ),
+    )
+
+    body = {"data": data, "total": total}
+    if cursor is not None:
+        body["cursor"] = next_cursor
+    response = jsonify(body)
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+
+@main.get("/api/orders/export")
+def get_orders_export():
+    format = request.args.get("format", "ndjson")
+    if format not in MIMETYPES:
+        abort(400, f"Unknown export format: {format}")
+
+    try:
+        query, params = export_query(
+            request.args.get("sort"),
+            request.args.get("search"),
+            request.args.get("customer"),
+            request.args.get("product"),
+        )
+    except ValueError as e:
+        abort(400, str(e))
+    dumps = partial(current_app.json.dumps, separators=(",", ":"))
+    body = export_orders(
+        query, params, format, dumps, current_app.config["EXPORT_CHUNK_SIZE"]
+    )
+    return current_app.response_class(
+        iterate(body),
+        mimetype=MIMETYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=orders.{format}"},
+    )
+
+
+@main.get("/api/products")
+async def get_products():
+    sort = request.args.get("sort", "-rating")
+    start = max(request.args.get("start", 0, type=int), 0)
+    length = min(max(request.args.get("length", 20, type=int), 1), 100)
+    if sort.lstrip("+- ") != "rating":
+        abort(400, f"Invalid sort column: {sort}")
+    query = Product.by_rating(start, length, descending=sort.startswith("-"))
+    async with db.ReadSession() as session:
+        ids = (await session.scalars(query)).all()
+        total = await session.scalar(db.select(db.func.count()).select_from(Product))
+    products = await db.catalog.get_products(ids)
+    return {"data": [products[id] for id in ids], "total": total}
+
+
+@main.get("/api/suggest")
+async def get_suggestions():
+    prefix = request.args.get("q", "").strip()
+    limit = min(request.args.get("limit", 10, type=int), 50)
+    if not prefix:
+        return {"data": []}
+    return {"data": await db.typeahead.suggest(prefix, limit)}
+
+
+def view_window(days):
+    until = request.args.get("until", date.today(), type=date.fromisoformat)
+    days = request.args.get("days", days, type=int)
+    return until - timedelta(days=days - 1), until
+
+
+@main.get("/api/articles/<int:article_id>/views")
+async def get_article_views(article_id):
+    since, until = view_window(30)
+    async with db.ReadSession() as session:
+        rows = await session.execute(
+            db.select(ArticleDailyViews.day, ArticleDailyViews.views)
+            .where(
+                ArticleDailyViews.article_id == article_id,
+                ArticleDailyViews.day.between(since, until),
+            )
+            .order_by(ArticleDailyViews.day)
+        )
+        days = [{"day": day.isoformat(), "views": views} for day, views in rows]
+    return {
+        "article_id": article_id,
+        "days": days,
+        "total": sum(day["views"] for day in days),
+    }
+
+
+@main.get("/api/articles/trending")
+async def get_trending_articles():
+    since, until = view_window(7)
+    limit = request.args.get("limit", 10, type=int)
+    top = trending(ArticleDailyViews, since, until, limit).subquery()
+    async with db.ReadSession() as session:
+        rows = await session.execute(
+            db.select(BlogArticle.id, BlogArticle.title, top.c.views)
+            .join(top, top.c.article_id == BlogArticle.id)
+            .order_by(top.c.views.desc(), BlogArticle.id)
+        )
+        data = [{"id": id, "title": title, "views": views} for id, title, views in rows]
+    return {"data": data}
+
+
+@main.get("/api/products/trending")
+async def get_trending_products():
+    since, until = view_window(7)
+    limit = request.args.get("limit", 10, type=int)
+    async with db.ReadSession() as session:
+        rows = (
+            await session.execute(trending(ProductDailyViews, since, until, limit))
+        ).all()
+    products = await db.catalog.get_products({product_id for product_id, _ in rows})
+    return {
+        "data": [
+            {"product": products[product_id], "views": views}
+            for product_id, views in rows
+        ]
+    }
+
+
+def sales_window(grain):
+    until = request.args.get("until", date.today(), type=date.fromisoformat)
+    if grain == "day":
+        since = until - timedelta(days=29)
+    else:
+        since = until.replace(year=until.year - 1, day=1)
+    since = request.args.get("since", since, type=date.fromisoformat)
+    if grain == "month":
+        return since.replace(day=1), until.replace(day=1)
+    return since, until
+
+
+@main.get("/api/sales")
+async def get_sales():
+    grain = request.args.get("grain", "month")
+    by = request.args.get("by")
+    if grain not in SALES_GRAINS:
+        abort(400, f"Unknown grain: {grain}")
+    if by is not None and by not in SALES_DIMENSIONS:
+        abort(400, f"Unknown dimension: {by}")
+    since, until = sales_window(grain)
+    async with db.ReadSession() as session:
+        rows = await session.execute(sales(grain, since, until, by))
+        data = [
+            {
+                "period": row.period.isoformat(),
+                **({by: {"id": row.id, "name": row.name}} if by else {}),
+                "items": row.items,
+                "units": row.units,
+                "revenue": round(row.revenue, 2),
+            }
+            for row in rows
+        ]
+    return {
+        "grain": grain,
+        "since": since.isoformat(),
+        "until": until.isoformat(),
+        "data": data,
+    }
+
+
+@main.get("/api/sales/customers")
+async def get_top_customers():
+    limit = min(max(request.args.get("limit", 10, type=int), 1), 100)
+    async with db.ReadSession() as session:
+        rows = await session.execute(top_customers(limit))
+        data = [
+            {
+                "customer": {"id": id.hex, "name": name},
+                "orders": orders,
+                "revenue": round(revenue, 2),
+            }
+            for id, name, orders, revenue in rows
+        ]
+    return {"data": data}
+
 
-    total_query = Order.total_orders(search)
-    order_query = Order.paginated_orders(start, length, sort, search)
+@main.get("/api/cache")
+async def get_cache_stats():
+    return {
+        **db.cache.stats(),
+        "catalog": db.catalog.stats(),
+        "compiled_cache": db.monitor.compiled_cache_stats(),
+    }
 
-    async with db.Session() as session:
-        total = await session.scalar(total_query)
-        orders = await session.stream(order_query)
-        data = [{**order[0].to_dict(), "total": order[1]} async for order in orders]
 
-        return {"data": data, "total": total}
+@main.get("/metrics")
+async def get_metrics():
+    if request.remote_addr not in LOCAL_ADDRESSES:
+        abort(404)
+    return db.monitor.render(), {"Content-Type": "text/plain; version=0.0.4"}
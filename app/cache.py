@@ -0,0 +1,154 @@
+import hashlib
+import threading
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
+from time import monotonic
+
+from app import changes
+
+MISSING = object()
+
+
+class CacheBackend:
+    """Storage for cached query results, tagged by the tables they read."""
+
+    async def get(self, key):
+        raise NotImplementedError
+
+    async def set(self, key, value, tags):
+        raise NotImplementedError
+
+    async def invalidate(self, tags):
+        raise NotImplementedError
+
+    async def clear(self):
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+
+class MemoryCacheBackend(CacheBackend):
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.tags = defaultdict(set)
+        self.counters = dict.fromkeys(
+            ["hits", "misses", "evictions", "expirations", "invalidations"], 0
+        )
+        self.lock = threading.Lock()
+
+    def _remove(self, key):
+        _, _, tags = self.entries.pop(key)
+        for tag in tags:
+            self.tags[tag].discard(key)
+
+    async def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] < monotonic():
+                self._remove(key)
+                self.counters["expirations"] += 1
+                entry = None
+            if entry is None:
+                self.counters["misses"] += 1
+                return MISSING
+            self.entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return entry[1]
+
+    async def set(self, key, value, tags):
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self.tags[tag].add(key)
+            while len(self.entries) > self.maxsize:
+                self._remove(next(iter(self.entries)))
+                self.counters["evictions"] += 1
+
+    async def invalidate(self, tags):
+        with self.lock:
+            for tag in tags:
+                for key in self.tags.pop(tag, set()):
+                    if key in self.entries:
+                        self._remove(key)
+                        self.counters["invalidations"] += 1
+
+    async def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.tags.clear()
+
+    def stats(self):
+        return {**self.counters, "size": len(self.entries), "maxsize": self.maxsize}
+
+
+@lru_cache(maxsize=1024)
+def compile_statement(statement, dialect):
+    """Return the SQL and default parameters of ``statement``, compiled once
+    per statement object, so reused statements are not compiled for keys."""
+    compiled = statement.compile(dialect=dialect)
+    return str(compiled), compiled.params
+
+
+class ResultCache:
+    """Cache query results until a commit changes one of the tables they read.
+
+    The tables changed by each commit are queued and dropped from the
+    backend before the next lookup. A result loaded while a commit lands is
+    returned but not stored, as it may have been read before the commit.
+    Writes from other processes are only picked up when entries expire.
+    """
+
+    def __init__(self, backend, dialect):
+        self.backend = backend
+        self.dialect = dialect
+        self.pending = set()
+        self.generation = 0
+        self.lock = threading.Lock()
+        changes.subscribe(self._after_commit)
+
+    def key(self, statement, params=None):
+        sql, defaults = compile_statement(statement, self.dialect)
+        params = sorted((k, repr(v)) for k, v in {**defaults, **(params or {})}.items())
+        return hashlib.sha256(f"{sql}\0{params}".encode()).hexdigest()
+
+    async def fetch(self, statement, loader, depends_on, params=None):
+        with self.lock:
+            pending, self.pending = self.pending, set()
+            generation = self.generation
+        if pending:
+            await self.backend.invalidate(pending)
+
+        key = self.key(statement, params)
+        value = await self.backend.get(key)
+        if value is MISSING:
+            value = await loader()
+            tags = {getattr(t, "__table__", t).name for t in depends_on}
+            with self.lock:
+                stale = self.generation != generation
+            if not stale:
+                await self.backend.set(key, value, tags)
+                with self.lock:
+                    # a commit landed while storing, drop it at the next lookup
+                    if self.generation != generation:
+                        self.pending |= tags
+        return value
+
+    def stats(self):
+        return self.backend.stats()
+
+    def _after_commit(self, tables):
+        with self.lock:
+            self.pending |= tables
+            self.generation += 1
+
+
+backends = {"memory": MemoryCacheBackend}
+
+
+def create_result_cache(dialect, backend="memory", **options):
+    return ResultCache(backends[backend](**options), dialect)
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+from time import monotonic
+
+from sqlalchemy.exc import DBAPIError
+
+from app import changes
+from app.extensions import db
+from app.loading import loading
+from app.models import Product
+
+TABLES = {"product", "manufacturer", "country", "product_country", "product_review"}
+
+
+class Catalog:
+    """Every product serialized with ``Product.to_dict``, keyed by id.
+
+    A commit that changes a product, manufacturer or country bumps the
+    version, and the next lookup reloads the catalog. Writes from other
+    processes are only picked up when it expires.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self.version = 0
+        self.products = {}
+        self.expires = 0
+        self.lock = threading.Lock()
+        changes.subscribe(self._after_commit)
+
+    def warm(self):
+        """Load the catalog now, unless the database has no tables yet."""
+        try:
+            asyncio.run(self.refresh())
+        except DBAPIError:
+            pass
+
+    async def refresh(self):
+        version = self.version
+        async with db.Session() as session:
+            query = db.select(Product).options(*loading("product_detail"))
+            products = (await session.scalars(query)).all()
+        data = {product.id: product.to_dict() for product in products}
+        with self.lock:
+            self.products = data
+            if self.version == version:
+                self.expires = monotonic() + self.ttl
+        return data
+
+    async def get_products(self, ids=()):
+        """Return the catalog, reloading it if it is stale or lacks ``ids``."""
+        products = self.products
+        if monotonic() >= self.expires or not products.keys() >= set(ids):
+            products = await self.refresh()
+        return products
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "products": len(self.products),
+            "ttl": self.ttl,
+        }
+
+    def _after_commit(self, tables):
+        if tables & TABLES:
+            with self.lock:
+                self.version += 1
+                self.expires = 0
@@ -0,0 +1,82 @@
+import threading
+from time import time, time_ns
+from uuid import uuid4
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+subscribers = []
+
+
+def subscribe(callback, key=None):
+    """Call ``callback`` with the names of the tables changed by each commit.
+
+    Flushes and bulk statements record the tables they write in
+    ``session.info``. With a ``key``, ``callback`` also gets the list other
+    listeners appended to ``session.info[key]`` during the transaction.
+    Callbacks run inside ``after_commit`` and must not use the session.
+    """
+    subscribers.append((callback, key))
+
+
+class DataVersion:
+    """Count the commits that change any of ``tables``.
+
+    ``tag`` also changes every ``ttl`` seconds, so writes from other
+    processes are picked up like expired result cache entries.
+    """
+
+    def __init__(self, tables, ttl=60):
+        self.tables = {getattr(t, "__table__", t).name for t in tables}
+        self.ttl = ttl
+        self.counter = 0
+        self.token = uuid4().hex[:8]
+        self.lock = threading.Lock()
+        subscribe(self._after_commit)
+
+    @property
+    def tag(self):
+        period = int(time() / self.ttl) if self.ttl else time_ns()
+        return f"{self.token}-{self.counter}-{period}"
+
+    def _after_commit(self, tables):
+        if tables & self.tables:
+            with self.lock:
+                self.counter += 1
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    tables = session.info.setdefault("changed_tables", set())
+    for obj in session.new | session.dirty | session.deleted:
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        tables.update(t.name for t in inspect(obj).mapper.tables)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _do_orm_execute(orm_execute_state):
+    state = orm_execute_state
+    if state.is_insert or state.is_update or state.is_delete:
+        tables = state.session.info.setdefault("changed_tables", set())
+        tables.add(state.statement.table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    tables = session.info.pop("changed_tables", None)
+    keys = {key for _, key in subscribers if key}
+    recorded = {key: session.info.pop(key, []) for key in keys}
+    if tables:
+        for callback, key in subscribers:
+            if key is None:
+                callback(tables)
+            else:
+                callback(tables, recorded[key])
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("changed_tables", None)
+    for _, key in subscribers:
+        session.info.pop(key, None)
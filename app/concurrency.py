@@ -0,0 +1,37 @@
+import asyncio
+
+
+async def gather(*aws):
+    """Await ``aws`` concurrently and return their results in order.
+
+    Unlike ``asyncio.gather``, the first failure cancels the awaitables that
+    are still running and waits for them to finish before it is raised, so
+    no session is left open once the caller moves on.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+def iterate(agen):
+    """Drive the async generator ``agen`` from synchronous code.
+
+    Async views return before a streaming response body is sent, so the
+    body runs ``agen`` on an event loop of its own until it is exhausted
+    or the client goes away.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(anext(agen))
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(agen.aclose())
+        loop.close()
@@ -7,3 +7,24 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv(
         "DATABASE_URL", "sqlite+aiosqlite:///" + os.path.join(basedir, "db.sqlite")
     )
+    DATABASE_REPLICA_URLS = [
+        url for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url
+    ]
+    REPLICA_STRATEGY = os.getenv("REPLICA_STRATEGY", "round_robin")
+    DATABASE_ENGINE_OPTIONS = {}
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "mmap_size": 268435456,
+        "busy_timeout": 5000,
+        "temp_store": "MEMORY",
+    }
+    RESULT_CACHE_BACKEND = os.getenv("RESULT_CACHE_BACKEND", "memory")
+    RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", 1024))
+    RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", 60))
+    CATALOG_TTL = float(os.getenv("CATALOG_TTL", 300))
+    TYPEAHEAD_TTL = float(os.getenv("TYPEAHEAD_TTL", 300))
+    EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 1000))
+    SLOW_QUERY_THRESHOLD = float(os.getenv("SLOW_QUERY_THRESHOLD", 0.1))
+    N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", 5))
@@ -0,0 +1,53 @@
+import re
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+EXPONENT = re.compile(rb"[:,\[]-?\d+(?:\.\d+)?e")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Encode compact JSON with orjson when it is installed.
+
+    The output matches ``DefaultJSONProvider``: keys are sorted and dates
+    go through ``default``. Bodies that orjson would write differently,
+    such as ones with non-ASCII text or floats in exponent notation, are
+    encoded by the standard library.
+    """
+
+    def _orjson_dumps(self, obj):
+        try:
+            data = orjson.dumps(
+                obj,
+                default=self.default,
+                option=orjson.OPT_SORT_KEYS
+                | orjson.OPT_PASSTHROUGH_DATETIME
+                | orjson.OPT_PASSTHROUGH_DATACLASS,
+            )
+        except TypeError:
+            return None
+        if not data.isascii() or EXPONENT.search(data):
+            return None
+        return data
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and kwargs == {"separators": (",", ":")}:
+            data = self._orjson_dumps(obj)
+            if data is not None:
+                return data.decode()
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if orjson is None or self.compact is False:
+            return super().response(*args, **kwargs)
+        if self.compact is None and self._app.debug:
+            return super().response(*args, **kwargs)
+
+        data = self._orjson_dumps(self._prepare_response_obj(args, kwargs))
+        if data is None:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(data + b"\n", mimetype=self.mimetype)
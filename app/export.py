@@ -0,0 +1,65 @@
+import csv
+import io
+
+from app.extensions import db
+from app.models import Order
+from app.projections import order_rows, stream_order_dicts
+
+CSV_COLUMNS = [
+    "order_id",
+    "timestamp",
+    "customer_id",
+    "customer_name",
+    "product_id",
+    "product_name",
+    "quantity",
+    "unit_price",
+    "total",
+]
+MIMETYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def export_query(sort, search, customer=None, product=None):
+    query, params = Order.paginated_orders(
+        None, None, sort, search, customer=customer, product=product
+    )
+    return order_rows(query), params
+
+
+def ndjson_chunk(orders, dumps):
+    return "".join(f"{dumps(order)}\n" for order in orders)
+
+
+def csv_chunk(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def csv_rows(orders):
+    for order in orders:
+        for item in order["order_items"] or [{"product": {}}]:
+            yield [
+                order["id"],
+                order["timestamp"],
+                order["customer"]["id"],
+                order["customer"]["name"],
+                item["product"].get("id"),
+                item["product"].get("name"),
+                item.get("quantity"),
+                item.get("unit_price"),
+                order["total"],
+            ]
+
+
+async def export_orders(query, params, format, dumps, chunk_size=1000):
+    """Yield the orders of ``query`` as NDJSON lines or CSV rows, one chunk
+    of text per ``chunk_size`` orders. CSV has a row per order item."""
+    async with db.ReadSession() as session:
+        if format == "csv":
+            yield csv_chunk([CSV_COLUMNS])
+        async for orders in stream_order_dicts(session, query, params, chunk_size):
+            if format == "csv":
+                yield csv_chunk(csv_rows(orders))
+            else:
+                yield ndjson_chunk(orders, dumps)
@@ -1,6 +1,16 @@
+import asyncio
+import itertools
+from contextvars import ContextVar
+from functools import partial
+
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import MetaData
+from sqlalchemy import MetaData, event, make_url
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
+from sqlalchemy.sql.dml import UpdateBase
+
+from app import changes
 
 db = SQLAlchemy(
     metadata=MetaData(
@@ -14,6 +24,120 @@ db = SQLAlchemy(
     )
 )
 
+POOL_PRESETS = {
+    "sqlite": {"poolclass": AsyncAdaptedQueuePool, "pool_size": 5, "max_overflow": 10},
+    "postgresql": {
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+    },
+    "mysql": {
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_pre_ping": True,
+        "pool_recycle": 3600,
+    },
+}
+
+
+def pool_options(url):
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {"poolclass": StaticPool}
+    return POOL_PRESETS.get(url.get_backend_name(), {})
+
+
+def set_sqlite_pragmas(pragmas, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def create_async_db_engine(DATABASE_URL, engine_options=None, sqlite_pragmas=None):
+    url = make_url(DATABASE_URL)
+    engine = create_async_engine(url, **{**pool_options(url), **(engine_options or {})})
+    if url.get_backend_name() == "sqlite" and sqlite_pragmas:
+        event.listen(
+            engine.sync_engine, "connect", partial(set_sqlite_pragmas, sqlite_pragmas)
+        )
+    return engine
+
+
+def warm_up_engine(engine):
+    """Run the first-connect hooks once, before requests on separate event
+    loops can race on the lock that guards them."""
+
+    async def connect():
+        async with engine.connect():
+            pass
+
+    asyncio.run(connect())
+
+
+def create_async_session(engine):
+    return async_sessionmaker(engine, expire_on_commit=False)
+
+
+read_primary = ContextVar("read_primary", default=False)
 
-def create_async_session(DATABASE_URL):
-    return async_sessionmaker(create_async_engine(DATABASE_URL), expire_on_commit=False)
+
+def read_your_writes():
+    """Send the read sessions opened from now on in this request (or task)
+    to the primary, so they see what was just written."""
+    read_primary.set(True)
+
+
+class ReplicaRouter:
+    """Pick the engine each read session reads from.
+
+    ``strategy`` is "round_robin", or "least_load" for the replica with the
+    fewest connections checked out. Without replicas, or after a commit
+    that changed tables in the current request, reads go to the primary.
+    """
+
+    def __init__(self, primary, replicas=(), strategy="round_robin"):
+        if strategy not in ("round_robin", "least_load"):
+            raise ValueError(f"Unknown replica strategy: {strategy}")
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.strategy = strategy
+        self.rotation = itertools.cycle(self.replicas)
+        changes.subscribe(self._after_commit)
+
+    @property
+    def engines(self):
+        return [self.primary] + self.replicas
+
+    def choose(self):
+        if not self.replicas or read_primary.get():
+            return self.primary
+        if self.strategy == "least_load":
+            return min(self.replicas, key=lambda engine: engine.pool.checkedout())
+        return next(self.rotation)
+
+    def _after_commit(self, tables):
+        read_your_writes()
+
+
+class ReadSession(Session):
+    """A session reading from the engine ``router`` picks when it opens.
+
+    Flushes and INSERT, UPDATE or DELETE statements still go to the primary.
+    """
+
+    def __init__(self, router, **kwargs):
+        super().__init__(**kwargs)
+        self.router = router
+        self.replica = router.choose().sync_engine
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or isinstance(clause, UpdateBase):
+            return self.router.primary.sync_engine
+        return self.replica
+
+
+def create_read_session(router):
+    return async_sessionmaker(
+        sync_session_class=ReadSession, router=router, expire_on_commit=False
+    )
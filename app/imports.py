@@ -0,0 +1,417 @@
+import csv
+from collections import defaultdict
+from hashlib import sha256
+from uuid import UUID, uuid4
+
+from sqlalchemy import delete, insert, or_, select, tuple_
+
+from app.models import (
+    BlogArticle,
+    BlogAuthor,
+    BlogSession,
+    BlogUser,
+    BlogView,
+    Country,
+    Customer,
+    ImportCheckpoint,
+    Manufacturer,
+    Order,
+    OrderItem,
+    Product,
+    ProductCountry,
+    ProductReview,
+)
+from app.pipeline import parse_timestamp
+from app.resolver import IN_BATCH_SIZE
+from app.rollups import upserts
+
+READ_SIZE = 1 << 20
+
+
+class CheckpointReader:
+    """Read the rows of a CSV file that come after a checkpoint.
+
+    The checkpoint is the byte offset of the end of the last row read and
+    the SHA-256 of the file up to there. If the start of the file no longer
+    has that hash, the file was replaced rather than appended to, and it is
+    read again from the first row.
+    """
+
+    def __init__(self, f, offset=0, digest=None):
+        self.file = f
+        self.start()
+        self.resumed = False
+        if offset > self.offset and digest is not None:
+            size = offset - self.offset
+            while size:
+                chunk = f.read(min(size, READ_SIZE))
+                if not chunk:
+                    break
+                self.hash.update(chunk)
+                size -= len(chunk)
+            if not size and self.hash.hexdigest() == digest:
+                self.offset = offset
+                self.resumed = True
+            else:
+                f.seek(0)
+                self.start()
+
+    def start(self):
+        self.offset = 0
+        self.hash = sha256()
+        self.fields = next(csv.reader(self.lines()))
+
+    @property
+    def digest(self):
+        return self.hash.hexdigest()
+
+    def lines(self):
+        # csv.reader asks for one line at a time, so after each row the
+        # offset and hash cover exactly the rows returned so far
+        for line in iter(self.file.readline, b""):
+            self.offset += len(line)
+            self.hash.update(line)
+            yield line.decode()
+
+    def rows(self):
+        for values in csv.reader(self.lines()):
+            yield dict(zip(self.fields, values))
+
+
+def batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class IncrementalImport:
+    """Upsert the rows of a CSV file added or changed since the last run.
+
+    Rows are written by natural key, one transaction per batch that also
+    moves the checkpoint, so an interrupted import resumes after the last
+    batch committed. Rows already stored with the same values are left
+    untouched.
+    """
+
+    def __init__(self, session, batch_size=1000):
+        self.session = session
+        self.batch_size = batch_size
+        self.upsert_class = upserts[session.bind.dialect.name]
+        self.unknown = defaultdict(set)
+        self.written = 0
+
+    async def run(self, name, path, load):
+        """Pass the new rows of ``path`` to ``load`` in batches and return
+        how many rows were read."""
+        checkpoint = await self.session.get(ImportCheckpoint, name)
+        if checkpoint is None:
+            checkpoint = ImportCheckpoint(name=name, file_offset=0)
+            self.session.add(checkpoint)
+        read = 0
+        with open(path, "rb") as f:
+            reader = CheckpointReader(f, checkpoint.file_offset, checkpoint.file_hash)
+            if checkpoint.file_offset and not reader.resumed:
+                print(f"{path} changed since the last import, reading all of it.")
+            for rows in batched(reader.rows(), self.batch_size):
+                await load(rows)
+                read += len(rows)
+                checkpoint.file_offset = reader.offset
+                checkpoint.file_hash = reader.digest
+                await self.session.commit()
+        return read
+
+    async def upsert(self, table, rows, keys, update=None):
+        """Insert ``rows``, updating the ``update`` columns of rows already
+        stored under the unique ``keys`` where their values differ, and
+        count the rows inserted or updated. Later rows win over earlier
+        rows with the same keys."""
+        rows = list({tuple(row[key] for key in keys): row for row in rows}.values())
+        if not rows:
+            return
+        if update is None:
+            update = [column for column in rows[0] if column not in keys]
+        statement = self.upsert_class(table)
+        if update:
+            statement = statement.on_conflict_do_update(
+                index_elements=keys,
+                set_={column: statement.excluded[column] for column in update},
+                where=or_(
+                    *[
+                        table.c[column].is_distinct_from(statement.excluded[column])
+                        for column in update
+                    ]
+                ),
+            )
+        else:
+            statement = statement.on_conflict_do_nothing(index_elements=keys)
+        result = await self.session.execute(statement, rows)
+        self.written += max(result.rowcount, 0)
+
+    async def insert(self, table, rows):
+        if rows:
+            await self.session.execute(insert(table), rows)
+            self.written += len(rows)
+
+    async def ids(self, column, keys):
+        """Return the ids of the rows with the given ``column`` values."""
+        model = column.class_
+        keys = list(set(keys))
+        found = {}
+        for i in range(0, len(keys), IN_BATCH_SIZE):
+            query = select(column, model.id).where(
+                column.in_(keys[i : i + IN_BATCH_SIZE])
+            )
+            found.update((await self.session.execute(query)).all())
+        return found
+
+    async def names(self, model, names):
+        """Return the ids of the rows of ``model`` with the given unique
+        names, inserting those that are missing."""
+        await self.upsert(model.__table__, [{"name": name} for name in names], ["name"])
+        return await self.ids(model.name, names)
+
+    def get(self, found, column, key):
+        value = found.get(key)
+        if value is None:
+            self.unknown[column].add(key)
+        return value
+
+    def report(self):
+        for column, keys in self.unknown.items():
+            print(
+                f"Skipped rows with {len(keys)} unknown "
+                f"{column.class_.__name__}.{column.key} values: "
+                + ", ".join(sorted(keys))
+            )
+
+    async def load_products(self, rows):
+        manufacturers = await self.names(
+            Manufacturer, {row["manufacturer"] for row in rows}
+        )
+        countries = await self.names(
+            Country, {name for row in rows for name in row["country"].split("/")}
+        )
+        await self.upsert(
+            Product.__table__,
+            [
+                {
+                    "name": row["name"],
+                    "manufacturer_id": manufacturers[row["manufacturer"]],
+                    "year": int(row["year"]),
+                    "cpu": row["cpu"],
+                }
+                for row in rows
+            ],
+            ["name"],
+        )
+        products = await self.ids(Product.name, [row["name"] for row in rows])
+        pairs = {
+            (products[row["name"]], countries[name])
+            for row in rows
+            for name in row["country"].split("/")
+        }
+        stored = set(
+            (
+                await self.session.execute(
+                    select(
+                        ProductCountry.c.product_id, ProductCountry.c.country_id
+                    ).where(ProductCountry.c.product_id.in_(products.values()))
+                )
+            ).all()
+        )
+        await self.insert(
+            ProductCountry,
+            [
+                {"product_id": product_id, "country_id": country_id}
+                for product_id, country_id in pairs - stored
+            ],
+        )
+        removed = stored - pairs
+        if removed:
+            await self.session.execute(
+                delete(ProductCountry).where(
+                    tuple_(
+                        ProductCountry.c.product_id, ProductCountry.c.country_id
+                    ).in_(removed)
+                )
+            )
+            self.written += len(removed)
+
+    async def load_orders(self, rows):
+        """Orders have no natural key of their own, so an order is matched
+        by its customer and timestamp. As in the full import, a customer's
+        address and phone come from the first row with their name, and the
+        details of customers already stored are left as they are."""
+        products = await self.ids(
+            Product.name,
+            [
+                row[f"product{i}"]
+                for row in rows
+                for i in (1, 2, 3)
+                if row[f"product{i}"]
+            ],
+        )
+        contacts = {}
+        for row in rows:
+            contacts.setdefault(
+                row["name"],
+                {
+                    "id": uuid4(),
+                    "name": row["name"],
+                    "address": row["address"],
+                    "phone": row["phone"],
+                },
+            )
+        await self.upsert(Customer.__table__, contacts.values(), ["name"], update=[])
+        customers = await self.ids(Customer.name, [row["name"] for row in rows])
+        stored = {}
+        customer_ids = list(set(customers.values()))
+        for i in range(0, len(customer_ids), IN_BATCH_SIZE):
+            query = select(Order.customer_id, Order.timestamp, Order.id).where(
+                Order.customer_id.in_(customer_ids[i : i + IN_BATCH_SIZE])
+            )
+            for customer_id, timestamp, order_id in await self.session.execute(query):
+                stored[customer_id, timestamp] = order_id
+
+        orders = {}
+        new_orders = []
+        items = []
+        for row in rows:
+            names = [row[f"product{i}"] for i in (1, 2, 3) if row[f"product{i}"]]
+            if any(self.get(products, Product.name, name) is None for name in names):
+                continue
+            key = (customers[row["name"]], parse_timestamp(row["timestamp"]))
+            order_id = stored.get(key) or orders.get(key)
+            if order_id is None:
+                order_id = uuid4()
+                new_orders.append(
+                    {"id": order_id, "timestamp": key[1], "customer_id": key[0]}
+                )
+            orders[key] = order_id
+            for i in (1, 2, 3):
+                if row[f"product{i}"]:
+                    items.append(
+                        {
+                            "order_id": order_id,
+                            "product_id": products[row[f"product{i}"]],
+                            "unit_price": float(row[f"unit_price{i}"]),
+                            "quantity": int(row[f"quantity{i}"]),
+                        }
+                    )
+        await self.insert(Order.__table__, new_orders)
+        await self.upsert(OrderItem.__table__, items, ["order_id", "product_id"])
+
+        # drop the items no longer listed on orders that were already stored
+        listed = {(item["order_id"], item["product_id"]) for item in items}
+        order_ids = [order_id for key, order_id in orders.items() if key in stored]
+        for i in range(0, len(order_ids), IN_BATCH_SIZE):
+            query = select(OrderItem.order_id, OrderItem.product_id).where(
+                OrderItem.order_id.in_(order_ids[i : i + IN_BATCH_SIZE])
+            )
+            for order_id, product_id in (await self.session.execute(query)).all():
+                if (order_id, product_id) not in listed:
+                    await self.session.execute(
+                        delete(OrderItem).filter_by(
+                            order_id=order_id, product_id=product_id
+                        )
+                    )
+                    self.written += 1
+
+    async def load_reviews(self, rows):
+        customers = await self.ids(Customer.name, [row["customer"] for row in rows])
+        products = await self.ids(Product.name, [row["product"] for row in rows])
+        reviews = []
+        for row in rows:
+            customer_id = self.get(customers, Customer.name, row["customer"])
+            product_id = self.get(products, Product.name, row["product"])
+            if customer_id is None or product_id is None:
+                continue
+            reviews.append(
+                {
+                    "product_id": product_id,
+                    "customer_id": customer_id,
+                    "timestamp": parse_timestamp(row["timestamp"]),
+                    "rating": int(row["rating"]),
+                    "comment": row["comment"] or None,
+                }
+            )
+        await self.upsert(
+            ProductReview.__table__, reviews, ["product_id", "customer_id"]
+        )
+
+    async def load_articles(self, rows):
+        products = await self.ids(
+            Product.name, [row["product"] for row in rows if row["product"]]
+        )
+        # author names are not unique in the schema, so they cannot be upserted
+        names = {row["author"] for row in rows}
+        authors = await self.ids(BlogAuthor.name, names)
+        await self.insert(
+            BlogAuthor.__table__,
+            [{"name": name} for name in sorted(names - authors.keys())],
+        )
+        authors.update(await self.ids(BlogAuthor.name, names - authors.keys()))
+        articles = []
+        for row in rows:
+            product_id = None
+            if row["product"]:
+                product_id = self.get(products, Product.name, row["product"])
+                if product_id is None:
+                    continue
+            articles.append(
+                {
+                    "title": row["title"],
+                    "author_id": authors[row["author"]],
+                    "product_id": product_id,
+                    "timestamp": parse_timestamp(row["timestamp"]),
+                }
+            )
+        await self.upsert(BlogArticle.__table__, articles, ["title"])
+
+    async def load_views(self, rows):
+        """Views have no natural key of their own, so a view is matched by
+        its session, article and timestamp."""
+        articles = await self.ids(BlogArticle.title, [row["title"] for row in rows])
+        customers = await self.ids(
+            Customer.name, [row["customer"] for row in rows if row["customer"]]
+        )
+        users, sessions, views = [], [], []
+        for row in rows:
+            article_id = self.get(articles, BlogArticle.title, row["title"])
+            if article_id is None:
+                continue
+            customer_id = None
+            if row["customer"]:
+                customer_id = self.get(customers, Customer.name, row["customer"])
+                if customer_id is None:
+                    continue
+            users.append({"id": UUID(row["user"]), "customer_id": customer_id})
+            sessions.append({"id": UUID(row["session"]), "user_id": UUID(row["user"])})
+            views.append(
+                {
+                    "article_id": article_id,
+                    "session_id": UUID(row["session"]),
+                    "timestamp": parse_timestamp(row["timestamp"]),
+                }
+            )
+        await self.upsert(BlogUser.__table__, users, ["id"])
+        await self.upsert(BlogSession.__table__, sessions, ["id"])
+
+        stored = set()
+        session_ids = list({view["session_id"] for view in views})
+        for i in range(0, len(session_ids), IN_BATCH_SIZE):
+            query = select(
+                BlogView.session_id, BlogView.article_id, BlogView.timestamp
+            ).where(BlogView.session_id.in_(session_ids[i : i + IN_BATCH_SIZE]))
+            stored.update((await self.session.execute(query)).all())
+        new_views = {}
+        for view in views:
+            key = (view["session_id"], view["article_id"], view["timestamp"])
+            if key not in stored:
+                new_views.setdefault(key, view)
+        await self.insert(BlogView.__table__, list(new_views.values()))
@@ -0,0 +1,245 @@
+import logging
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from time import perf_counter
+
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import default
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|\$\d+|:\w+)"
+IN_LIST = re.compile(rf"\(\s*{PLACEHOLDER}(?:\s*,\s*{PLACEHOLDER})+\s*\)")
+EXPLAIN = {
+    "sqlite": "EXPLAIN QUERY PLAN ",
+    "postgresql": "EXPLAIN ",
+    "mysql": "EXPLAIN ",
+}
+DURATION_BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5]
+COUNT_BUCKETS = [1, 2, 3, 5, 10, 25, 50, 100]
+PARAMETERS_LIMIT = 200
+COMPILED_CACHE_RESULTS = {
+    default.CACHE_HIT: "hit",
+    default.CACHE_MISS: "miss",
+    default.CACHING_DISABLED: "disabled",
+    default.NO_CACHE_KEY: "no_key",
+    default.NO_DIALECT_SUPPORT: "unsupported",
+}
+
+current_queries = ContextVar("current_queries", default=None)
+
+
+def shorten(text, limit=PARAMETERS_LIMIT):
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def statement_shape(statement):
+    """Collapse expanded ``IN`` lists, so that statements differing only in
+    their number of parameters have the same shape."""
+    return IN_LIST.sub("(?)", statement)
+
+
+def explain(conn, statement, parameters):
+    """Return the query plan rows of a statement about to run or just run on
+    ``conn``, or None if the dialect has no EXPLAIN support here.
+
+    A raw cursor is used, so the EXPLAIN does not go through engine events.
+    """
+    prefix = EXPLAIN.get(conn.dialect.name)
+    if prefix is None:
+        return None
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def render(self, name, labels=""):
+        lines = []
+        cumulative = 0
+        for bucket, count in zip(self.buckets + ["+Inf"], self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}le="{bucket}"}} {cumulative}')
+        labels = f"{{{labels.rstrip(',')}}}" if labels else ""
+        lines.append(f"{name}_sum{labels} {self.sum}")
+        lines.append(f"{name}_count{labels} {cumulative}")
+        return lines
+
+
+class RequestQueries:
+    """The statements run while handling one request."""
+
+    def __init__(self, keep=3):
+        self.keep = keep
+        self.count = 0
+        self.duration = 0.0
+        self.slowest = []
+        self.shapes = Counter()
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.slowest.append((duration, statement))
+        self.slowest.sort(key=lambda query: query[0], reverse=True)
+        del self.slowest[self.keep :]
+        shape = statement_shape(statement)
+        self.shapes[shape] += 1
+        return self.shapes[shape]
+
+
+class QueryMonitor:
+    """Time the statements run by an engine, per request and overall.
+
+    Statements slower than ``slow_threshold`` seconds are logged with their
+    query plan, and a statement shape repeated ``n_plus_one_threshold`` times
+    in one request is logged as a likely N+1 query.
+    """
+
+    def __init__(self, slow_threshold=0.1, n_plus_one_threshold=5):
+        self.slow_threshold = slow_threshold
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.query_duration = Histogram(DURATION_BUCKETS)
+        self.request_queries = defaultdict(lambda: Histogram(COUNT_BUCKETS))
+        self.request_duration = defaultdict(lambda: Histogram(DURATION_BUCKETS))
+        self.counters = dict.fromkeys(["slow_queries", "n_plus_one"], 0)
+        self.compiled_cache = dict.fromkeys(COMPILED_CACHE_RESULTS.values(), 0)
+        self.engines = []
+        self.lock = threading.Lock()
+
+    def instrument(self, engine):
+        engine = getattr(engine, "sync_engine", engine)
+        self.engines.append(engine)
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def init_app(self, app):
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+
+    def _before_cursor_execute(self, conn, cursor, statement, *args):
+        conn.info["query_start"] = perf_counter()
+
+    def _after_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        duration = perf_counter() - conn.info["query_start"]
+        with self.lock:
+            self.query_duration.observe(duration)
+            if context is not None:
+                self.compiled_cache[COMPILED_CACHE_RESULTS[context.cache_hit]] += 1
+
+        queries = current_queries.get()
+        if queries is not None:
+            repeats = queries.record(statement, duration)
+            if repeats == self.n_plus_one_threshold:
+                with self.lock:
+                    self.counters["n_plus_one"] += 1
+                logger.warning(
+                    "Likely N+1 query, run %d times by %s: %s",
+                    repeats,
+                    request.endpoint,
+                    statement_shape(statement),
+                )
+
+        if duration >= self.slow_threshold:
+            with self.lock:
+                self.counters["slow_queries"] += 1
+            message = "Slow query (%.1f ms): %s\nParameters: %s"
+            args = [duration * 1000, statement]
+            if executemany:
+                # whole import batches, too long and too personal to log
+                args.append(f"{len(parameters)} parameter sets")
+                plan = None
+            else:
+                args.append(shorten(repr(parameters)))
+                plan = self.explain(conn, statement, parameters)
+            if plan is not None:
+                message += "\nPlan:\n%s"
+                args.append(plan)
+            logger.warning(message, *args)
+
+    def explain(self, conn, statement, parameters):
+        if not statement.lstrip().upper().startswith("SELECT"):
+            return None
+        try:
+            rows = explain(conn, statement, parameters)
+        except conn.dialect.dbapi.Error as e:
+            return f"unavailable: {e}"
+        if rows is not None:
+            return "\n".join(" | ".join(map(str, row)) for row in rows)
+
+    def start_request(self):
+        current_queries.set(RequestQueries())
+
+    def finish_request(self, response):
+        queries = current_queries.get()
+        if queries is None:
+            return response
+        current_queries.set(None)
+        endpoint = str(request.endpoint)
+        with self.lock:
+            self.request_queries[endpoint].observe(queries.count)
+            self.request_duration[endpoint].observe(queries.duration)
+        response.headers.add(
+            "Server-Timing",
+            f'db;dur={queries.duration * 1000:.1f};desc="{queries.count} queries"',
+        )
+        logger.debug(
+            "%s ran %d queries in %.1f ms, slowest: %s",
+            endpoint,
+            queries.count,
+            queries.duration * 1000,
+            queries.slowest,
+        )
+        return response
+
+    def compiled_cache_stats(self):
+        """Return how often statements were found in the engine's compiled
+        cache instead of being compiled again."""
+        with self.lock:
+            stats = dict(self.compiled_cache)
+        lookups = stats["hit"] + stats["miss"]
+        stats["hit_ratio"] = stats["hit"] / lookups if lookups else None
+        stats["size"] = sum(
+            len(engine._compiled_cache)
+            for engine in self.engines
+            if engine._compiled_cache is not None
+        )
+        return stats
+
+    def render(self):
+        """Return the metrics in the Prometheus text format."""
+        with self.lock:
+            lines = ["# TYPE db_query_duration_seconds histogram"]
+            lines += self.query_duration.render("db_query_duration_seconds")
+            lines.append("# TYPE db_request_queries histogram")
+            for endpoint, histogram in sorted(self.request_queries.items()):
+                labels = f'endpoint="{endpoint}",'
+                lines += histogram.render("db_request_queries", labels)
+            lines.append("# TYPE db_request_duration_seconds histogram")
+            for endpoint, histogram in sorted(self.request_duration.items()):
+                labels = f'endpoint="{endpoint}",'
+                lines += histogram.render("db_request_duration_seconds", labels)
+            for name, value in self.counters.items():
+                lines.append(f"# TYPE db_{name}_total counter")
+                lines.append(f"db_{name}_total {value}")
+            lines.append("# TYPE db_compiled_cache_total counter")
+            for result, value in self.compiled_cache.items():
+                lines.append(f'db_compiled_cache_total{{result="{result}"}} {value}')
+        return "\n".join(lines) + "\n"
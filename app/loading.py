@@ -0,0 +1,31 @@
+from sqlalchemy.orm import joinedload, noload, raiseload, selectinload
+
+from app.models import Order, OrderItem, Product
+
+LOADING_PROFILES = {
+    "order_listing": (
+        joinedload(Order.customer),
+        selectinload(Order.order_items)
+        .joinedload(OrderItem.product)
+        .options(joinedload(Product.manufacturer), selectinload(Product.countries)),
+        raiseload("*"),
+    ),
+    "product_detail": (
+        joinedload(Product.manufacturer),
+        selectinload(Product.countries),
+        raiseload("*"),
+    ),
+    # rows are only looked up or linked to new rows, so nothing is loaded
+    "bulk_import": (noload("*"),),
+}
+
+
+def loading(profile):
+    """Return the loader options of a profile, to be passed to
+    ``Select.options()``.
+
+    Relationships default to ``raise_on_sql``, so a query that reaches a
+    relationship its profile does not load fails instead of issuing more
+    queries.
+    """
+    return LOADING_PROFILES[profile]
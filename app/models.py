@@ -1,21 +1,25 @@
-from datetime import UTC, datetime
+from datetime import UTC, date, datetime
+from functools import lru_cache
 from typing import Optional
 from uuid import UUID, uuid4
 
 from sqlalchemy import (
+    DDL,
     Column,
     ForeignKey,
+    Index,
+    Integer,
     String,
     Text,
-    distinct,
+    bindparam,
     event,
     func,
     inspect,
-    or_,
 )
 from sqlalchemy.orm import Mapped, WriteOnlyMapped, mapped_column, relationship
 
 from app.extensions import db
+from app.pagination import decode_cursor, encode_cursor, keyset_condition
 
 ProductCountry = db.Table(
     "product_country",
@@ -31,18 +35,26 @@ class Product(db.Model):
         ForeignKey("manufacturer.id"), index=True
     )
     manufacturer: Mapped["Manufacturer"] = relationship(
-        back_populates="products", lazy="joined", innerjoin=True
+        back_populates="products", lazy="raise_on_sql", innerjoin=True
     )
     year: Mapped[int] = mapped_column(index=True)
     cpu: Mapped[Optional[str]] = mapped_column(String(32))
     countries: Mapped[list["Country"]] = relationship(
-        back_populates="products", secondary=ProductCountry, lazy="selectin"
+        back_populates="products", secondary=ProductCountry, lazy="raise_on_sql"
     )
     order_items: WriteOnlyMapped["OrderItem"] = relationship(back_populates="product")
     reviews: WriteOnlyMapped["ProductReview"] = relationship(back_populates="product")
     blog_articles: WriteOnlyMapped["BlogArticle"] = relationship(
         back_populates="product"
     )
+    rating_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    rating_sum: Mapped[int] = mapped_column(default=0, server_default="0")
+    rating_1: Mapped[int] = mapped_column(default=0, server_default="0")
+    rating_2: Mapped[int] = mapped_column(default=0, server_default="0")
+    rating_3: Mapped[int] = mapped_column(default=0, server_default="0")
+    rating_4: Mapped[int] = mapped_column(default=0, server_default="0")
+    rating_5: Mapped[int] = mapped_column(default=0, server_default="0")
+    rating_average: Mapped[Optional[float]] = mapped_column(index=True)
 
     def to_dict(self):
         return {
@@ -52,14 +64,35 @@ class Product(db.Model):
             "year": self.year,
             "cpu": self.cpu,
             "countries": [country.to_dict() for country in self.countries],
+            "rating": {
+                "count": self.rating_count,
+                "average": self.rating_average,
+                "histogram": [
+                    self.rating_1,
+                    self.rating_2,
+                    self.rating_3,
+                    self.rating_4,
+                    self.rating_5,
+                ],
+            },
         }
 
+    @staticmethod
+    def by_rating(start, length, descending=True):
+        """Return the statement selecting a page of product ids ordered by
+        average rating, with unrated products at the low end."""
+        if descending:
+            keys = (Product.rating_average.desc().nulls_last(), Product.id.desc())
+        else:
+            keys = (Product.rating_average.nulls_first(), Product.id)
+        return db.select(Product.id).order_by(*keys).offset(start).limit(length)
+
 
 class Country(db.Model):
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(32), index=True, unique=True)
     products: Mapped[list["Product"]] = relationship(
-        back_populates="countries", secondary=ProductCountry, lazy="selectin"
+        back_populates="countries", secondary=ProductCountry, lazy="raise_on_sql"
     )
 
     def to_dict(self):
@@ -73,7 +106,7 @@ class Manufacturer(db.Model):
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(64), index=True, unique=True)
     products: Mapped[list["Product"]] = relationship(
-        back_populates="manufacturer", cascade="all, delete-orphan", lazy="selectin"
+        back_populates="manufacturer", cascade="all, delete-orphan", lazy="raise_on_sql"
     )
 
     def to_dict(self):
@@ -87,11 +120,13 @@ class Order(db.Model):
     )
     customer_id: Mapped[UUID] = mapped_column(ForeignKey("customer.id"), index=True)
     customer: Mapped["Customer"] = relationship(
-        back_populates="orders", lazy="joined", innerjoin=True
+        back_populates="orders", lazy="raise_on_sql", innerjoin=True
     )
     order_items: Mapped[list["OrderItem"]] = relationship(
-        back_populates="order", lazy="selectin"
+        back_populates="order", lazy="raise_on_sql"
     )
+    total: Mapped[float] = mapped_column(default=0, server_default="0", index=True)
+    item_count: Mapped[int] = mapped_column(default=0, server_default="0")
 
     def to_dict(self):
         return {
@@ -99,64 +134,66 @@ class Order(db.Model):
             "timestamp": self.timestamp.isoformat(),
             "customer": self.customer.to_dict(),
             "order_items": [item.to_dict() for item in self.order_items],
+            "total": self.total,
         }
 
     @staticmethod
-    def total_orders(search):
-        if not search:
-            return db.select(func.count(Order.id))
-        return (
-            db.select(func.count(distinct(Order.id)))
-            .join(Order.customer)
-            .join(Order.order_items)
-            .join(OrderItem.product)
-            .where(
-                or_(
-                    Customer.name.ilike(f"%{search}%"),
-                    Product.name.ilike(f"%{search}%"),
-                )
-            )
-        )
+    def total_orders(search, customer=None, product=None):
+        """Return the count statement for the filters and its parameters."""
+        params = filter_params(search, customer, product)
+        return order_total(tuple(params)), params
+
+    @staticmethod
+    def parse_sort(sort):
+        if not sort:
+            return ()
+        keys = []
+        for s in sort.split(","):
+            # a "+" left unencoded in the query string arrives as a space
+            direction, name = s[:1], s[1:]
+            if direction not in "+- " or name not in ORDER_SORT_COLUMNS:
+                raise ValueError(f"Invalid sort column: {s}")
+            if name in dict(keys):
+                raise ValueError(f"Duplicate sort column: {name}")
+            keys.append((name, direction == "-"))
+        return tuple(keys)
 
     @staticmethod
-    def paginated_orders(start, length, sort, search):
-        total = func.sum(OrderItem.quantity * OrderItem.unit_price).label(None)
-        q = (
-            db.select(Order, total)
-            .join(Order.customer)
-            .join(Order.order_items)
-            .join(OrderItem.product)
-            .group_by(Order)
-            .distinct()
+    def paginated_orders(
+        start, length, sort, search, cursor=None, customer=None, product=None
+    ):
+        """Return the page statement for ``sort`` and its parameters.
+
+        Orders match the ``search`` text and, when given, have the exact
+        ``customer`` id or an item of the ``product`` id. Pages start at
+        offset ``start`` or, when ``cursor`` is given, after the order it
+        encodes. An empty ``cursor`` requests the first page.
+        """
+        keys = Order.parse_sort(sort)
+        params = filter_params(search, customer, product)
+        filters = tuple(params)
+        if start is not None and cursor is None:
+            params["offset"] = int(start)
+        if length is not None:
+            params["limit"] = int(length)
+        if cursor:
+            types = [ORDER_SORT_COLUMNS[name].type.python_type for name, _ in keys]
+            values = decode_cursor(cursor, sort, types + [UUID])
+            params.update((f"cursor_{i}", value) for i, value in enumerate(values))
+
+        keyset = None if cursor is None else bool(cursor)
+        statement = order_page(
+            keys, filters, keyset, "offset" in params, "limit" in params
         )
+        return statement, params
 
-        if search:
-            q = q.where(
-                or_(
-                    Customer.name.ilike(f"%{search}%"),
-                    Product.name.ilike(f"%{search}%"),
-                )
-            )
-
-        if sort:
-            order = []
-            for s in sort.split(","):
-                direction = s[0]
-                name = s[1:]
-                if name == "customer":
-                    column = Customer.name
-                elif name == "total":
-                    column = total
-                else:
-                    column = getattr(Order, name)
-                if direction == "-":
-                    column = column.desc()
-                order.append(column)
-            q = q.order_by(*order)
-
-        q = q.offset(start).limit(length)
-
-        return q
+    @staticmethod
+    def next_cursor(sort, row):
+        values = [
+            row.customer_name if name == "customer" else getattr(row, name)
+            for name, _ in Order.parse_sort(sort)
+        ]
+        return encode_cursor(sort, values + [row.id])
 
 
 class Customer(db.Model):
@@ -179,14 +216,90 @@ class Customer(db.Model):
         }
 
 
+ORDER_SORT_COLUMNS = {
+    "timestamp": Order.timestamp,
+    "customer": Customer.name,
+    "total": Order.total,
+}
+
+
+def filter_params(search, customer=None, product=None):
+    """Return the bound parameters of the order filters in use, raising
+    ``ValueError`` for a malformed customer or product id."""
+    params = {}
+    if search:
+        params["search"] = f"%{search}%"
+    if customer:
+        params["customer"] = customer if isinstance(customer, UUID) else UUID(customer)
+    if product:
+        params["product"] = int(product)
+    return params
+
+
+def order_filter(name):
+    if name == "search":
+        return Order.id.in_(db.search.order_ids(bindparam("search")))
+    if name == "customer":
+        return Order.customer_id == bindparam("customer")
+    return Order.id.in_(
+        db.select(OrderItem.order_id).where(
+            OrderItem.product_id == bindparam("product")
+        )
+    )
+
+
+@lru_cache(maxsize=None)
+def order_total(filters):
+    if not filters:
+        return db.select(func.count(Order.id))
+    if filters == ("search",):
+        return db.select(func.count()).select_from(
+            db.search.order_ids(bindparam("search")).subquery()
+        )
+    return db.select(func.count(Order.id)).where(*map(order_filter, filters))
+
+
+@lru_cache(maxsize=None)
+def order_page(keys, filters, keyset, offset, limit):
+    """Build the page statement of one sort, leaving the filter values,
+    offset, limit and cursor values as bound parameters.
+
+    ``keys`` are checked by ``Order.parse_sort``, so there is one statement
+    per whitelisted sort and combination of filters, and the cache stays
+    bounded.
+    """
+    q = db.select(Order).join(Order.customer).where(*map(order_filter, filters))
+
+    columns = [ORDER_SORT_COLUMNS[name] for name, _ in keys]
+    descending = [desc for _, desc in keys]
+    if keyset is not None:
+        columns.append(Order.id)
+        descending.append(False)
+
+    if columns:
+        q = q.order_by(
+            *[c.desc() if desc else c for c, desc in zip(columns, descending)]
+        )
+    if keyset:
+        values = [bindparam(f"cursor_{i}") for i in range(len(columns))]
+        q = q.where(keyset_condition(columns, descending, values))
+    if offset:
+        q = q.offset(bindparam("offset", type_=Integer))
+    if limit:
+        q = q.limit(bindparam("limit", type_=Integer))
+    return q
+
+
 class OrderItem(db.Model):
     product_id: Mapped[int] = mapped_column(ForeignKey("product.id"), primary_key=True)
     product: Mapped["Product"] = relationship(
-        back_populates="order_items", lazy="joined", innerjoin=True
+        back_populates="order_items", lazy="raise_on_sql", innerjoin=True
+    )
+    order_id: Mapped[UUID] = mapped_column(
+        ForeignKey("order.id"), primary_key=True, index=True
     )
-    order_id: Mapped[UUID] = mapped_column(ForeignKey("order.id"), primary_key=True)
     order: Mapped["Order"] = relationship(
-        back_populates="order_items", lazy="joined", innerjoin=True
+        back_populates="order_items", lazy="raise_on_sql", innerjoin=True
     )
     unit_price: Mapped[float]
     quantity: Mapped[int]
@@ -202,7 +315,7 @@ class OrderItem(db.Model):
 class ProductReview(db.Model):
     product_id: Mapped[int] = mapped_column(ForeignKey("product.id"), primary_key=True)
     customer_id: Mapped[UUID] = mapped_column(
-        ForeignKey("customer.id"), primary_key=True
+        ForeignKey("customer.id"), primary_key=True, index=True
     )
     timestamp: Mapped[datetime] = mapped_column(
         default=lambda: datetime.now(UTC), index=True
@@ -210,16 +323,16 @@ class ProductReview(db.Model):
     rating: Mapped[int]
     comment: Mapped[Optional[str]] = mapped_column(Text)
     product: Mapped["Product"] = relationship(
-        back_populates="reviews", lazy="joined", innerjoin=True
+        back_populates="reviews", lazy="raise_on_sql", innerjoin=True
     )
     customer: Mapped["Customer"] = relationship(
-        back_populates="product_reviews", lazy="joined", innerjoin=True
+        back_populates="product_reviews", lazy="raise_on_sql", innerjoin=True
     )
 
 
 class BlogArticle(db.Model):
     id: Mapped[int] = mapped_column(primary_key=True)
-    title: Mapped[str] = mapped_column(String(128), index=True)
+    title: Mapped[str] = mapped_column(String(128), index=True, unique=True)
     author_id: Mapped[int] = mapped_column(ForeignKey("blog_author.id"), index=True)
     product_id: Mapped[Optional[int]] = mapped_column(
         ForeignKey("product.id"), index=True
@@ -228,26 +341,26 @@ class BlogArticle(db.Model):
         default=lambda: datetime.now(UTC), index=True
     )
     author: Mapped["BlogAuthor"] = relationship(
-        back_populates="articles", lazy="joined", innerjoin=True
+        back_populates="articles", lazy="raise_on_sql", innerjoin=True
     )
     product: Mapped[Optional["Product"]] = relationship(
-        back_populates="blog_articles", lazy="joined"
+        back_populates="blog_articles", lazy="raise_on_sql"
     )
     views: WriteOnlyMapped["BlogView"] = relationship(back_populates="article")
     language_id: Mapped[Optional[int]] = mapped_column(
         ForeignKey("language.id"), index=True
     )
     language: Mapped[Optional["Language"]] = relationship(
-        back_populates="blog_articles", lazy="joined"
+        back_populates="blog_articles", lazy="raise_on_sql"
     )
     translation_of_id: Mapped[Optional[int]] = mapped_column(
         ForeignKey("blog_article.id"), index=True
     )
     translation_of: Mapped[Optional["BlogArticle"]] = relationship(
-        remote_side=id, back_populates="translations", lazy="joined"
+        remote_side=id, back_populates="translations", lazy="raise_on_sql"
     )
     translations: Mapped[list["BlogArticle"]] = relationship(
-        back_populates="translation_of", lazy="selectin"
+        back_populates="translation_of", lazy="raise_on_sql"
     )
 
 
@@ -263,7 +376,7 @@ class BlogUser(db.Model):
         ForeignKey("customer.id"), index=True
     )
     customer: Mapped[Optional["Customer"]] = relationship(
-        back_populates="blog_users", lazy="joined"
+        back_populates="blog_users", lazy="raise_on_sql"
     )
     sessions: WriteOnlyMapped["BlogSession"] = relationship(back_populates="user")
 
@@ -272,23 +385,85 @@ class BlogSession(db.Model):
     id: Mapped[UUID] = mapped_column(default=uuid4, primary_key=True)
     user_id: Mapped[UUID] = mapped_column(ForeignKey("blog_user.id"), index=True)
     user: Mapped["BlogUser"] = relationship(
-        back_populates="sessions", lazy="joined", innerjoin=True
+        back_populates="sessions", lazy="raise_on_sql", innerjoin=True
     )
     views: WriteOnlyMapped["BlogView"] = relationship(back_populates="session")
 
 
 class BlogView(db.Model):
     id: Mapped[int] = mapped_column(primary_key=True)
-    article_id: Mapped[int] = mapped_column(ForeignKey("blog_article.id"))
-    session_id: Mapped[UUID] = mapped_column(ForeignKey("blog_session.id"))
+    article_id: Mapped[int] = mapped_column(ForeignKey("blog_article.id"), index=True)
+    session_id: Mapped[UUID] = mapped_column(ForeignKey("blog_session.id"), index=True)
     timestamp: Mapped[datetime] = mapped_column(
         default=lambda: datetime.now(UTC), index=True
     )
     article: Mapped["BlogArticle"] = relationship(
-        back_populates="views", lazy="joined", innerjoin=True
+        back_populates="views", lazy="raise_on_sql", innerjoin=True
     )
     session: Mapped["BlogSession"] = relationship(
-        back_populates="views", lazy="joined", innerjoin=True
+        back_populates="views", lazy="raise_on_sql", innerjoin=True
+    )
+
+
+class ArticleDailyViews(db.Model):
+    article_id: Mapped[int] = mapped_column(
+        ForeignKey("blog_article.id"), primary_key=True
+    )
+    day: Mapped[date] = mapped_column(primary_key=True, index=True)
+    views: Mapped[int] = mapped_column(default=0)
+
+
+class LanguageDailyViews(db.Model):
+    language_id: Mapped[int] = mapped_column(
+        ForeignKey("language.id"), primary_key=True
+    )
+    day: Mapped[date] = mapped_column(primary_key=True, index=True)
+    views: Mapped[int] = mapped_column(default=0)
+
+
+class ProductDailyViews(db.Model):
+    product_id: Mapped[int] = mapped_column(ForeignKey("product.id"), primary_key=True)
+    day: Mapped[date] = mapped_column(primary_key=True, index=True)
+    views: Mapped[int] = mapped_column(default=0)
+
+
+class ProductDailySales(db.Model):
+    product_id: Mapped[int] = mapped_column(ForeignKey("product.id"), primary_key=True)
+    day: Mapped[date] = mapped_column(primary_key=True, index=True)
+    items: Mapped[int] = mapped_column(default=0)
+    units: Mapped[int] = mapped_column(default=0)
+    revenue: Mapped[float] = mapped_column(default=0)
+
+
+class ProductMonthlySales(db.Model):
+    product_id: Mapped[int] = mapped_column(ForeignKey("product.id"), primary_key=True)
+    month: Mapped[date] = mapped_column(primary_key=True, index=True)
+    items: Mapped[int] = mapped_column(default=0)
+    units: Mapped[int] = mapped_column(default=0)
+    revenue: Mapped[float] = mapped_column(default=0)
+
+
+class CustomerSales(db.Model):
+    __table_args__ = (Index("ix_customer_sales_revenue", "revenue", "customer_id"),)
+
+    customer_id: Mapped[UUID] = mapped_column(
+        ForeignKey("customer.id"), primary_key=True
+    )
+    orders: Mapped[int] = mapped_column(default=0)
+    revenue: Mapped[float] = mapped_column(default=0)
+
+
+class RollupWatermark(db.Model):
+    name: Mapped[str] = mapped_column(String(32), primary_key=True)
+    last_id: Mapped[int] = mapped_column(default=0)
+
+
+class ImportCheckpoint(db.Model):
+    name: Mapped[str] = mapped_column(String(32), primary_key=True)
+    file_offset: Mapped[int] = mapped_column(default=0)
+    file_hash: Mapped[Optional[str]] = mapped_column(String(64))
+    timestamp: Mapped[datetime] = mapped_column(
+        default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC)
     )
 
 
@@ -308,3 +483,326 @@ def init_relationships(tgt, arg, kw):
             continue  # skip write-only and similar relationships
         if arg.key not in kw:
             kw.setdefault(arg.key, None if not arg.uselist else arg.collection_class())
+
+
+ORDER_TOTALS_TRIGGERS = {
+    "sqlite": [
+        """CREATE TRIGGER order_item_insert_totals AFTER INSERT ON order_item
+        BEGIN
+            UPDATE "order"
+            SET total = total + NEW.quantity * NEW.unit_price,
+                item_count = item_count + 1
+            WHERE id = NEW.order_id;
+        END""",
+        """CREATE TRIGGER order_item_update_totals
+        AFTER UPDATE OF order_id, quantity, unit_price ON order_item
+        BEGIN
+            UPDATE "order"
+            SET total = total - OLD.quantity * OLD.unit_price,
+                item_count = item_count - 1
+            WHERE id = OLD.order_id;
+            UPDATE "order"
+            SET total = total + NEW.quantity * NEW.unit_price,
+                item_count = item_count + 1
+            WHERE id = NEW.order_id;
+        END""",
+        """CREATE TRIGGER order_item_delete_totals AFTER DELETE ON order_item
+        BEGIN
+            UPDATE "order"
+            SET total = total - OLD.quantity * OLD.unit_price,
+                item_count = item_count - 1
+            WHERE id = OLD.order_id;
+        END""",
+    ],
+    "postgresql": [
+        """CREATE FUNCTION order_item_totals() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE "order"
+                SET total = total - OLD.quantity * OLD.unit_price,
+                    item_count = item_count - 1
+                WHERE id = OLD.order_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                UPDATE "order"
+                SET total = total + NEW.quantity * NEW.unit_price,
+                    item_count = item_count + 1
+                WHERE id = NEW.order_id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql""",
+        """CREATE TRIGGER order_item_totals
+        AFTER INSERT OR UPDATE OR DELETE ON order_item
+        FOR EACH ROW EXECUTE FUNCTION order_item_totals()""",
+    ],
+}
+
+for dialect, statements in ORDER_TOTALS_TRIGGERS.items():
+    for statement in statements:
+        event.listen(
+            OrderItem.__table__,
+            "after_create",
+            DDL(statement).execute_if(dialect=dialect),
+        )
+
+
+SALES_BUCKETS = {
+    "sqlite": {"day": "date({})", "month": "date({}, 'start of month')"},
+    "postgresql": {
+        "day": "CAST({} AS DATE)",
+        "month": "CAST(date_trunc('month', {}) AS DATE)",
+    },
+}
+SALES_ROLLUPS = {"product_daily_sales": "day", "product_monthly_sales": "month"}
+
+
+def add_item_sales(dialect, item, timestamp, source):
+    """Return the upserts adding the order items selected from ``source``
+    to the product sales rollups."""
+    return [
+        f"""INSERT INTO {table} (product_id, {grain}, items, units, revenue)
+            SELECT {item}.product_id, {SALES_BUCKETS[dialect][grain].format(timestamp)},
+                1, {item}.quantity, {item}.quantity * {item}.unit_price
+            FROM {source}
+            ON CONFLICT (product_id, {grain}) DO UPDATE
+            SET items = {table}.items + excluded.items,
+                units = {table}.units + excluded.units,
+                revenue = {table}.revenue + excluded.revenue;"""
+        for table, grain in SALES_ROLLUPS.items()
+    ]
+
+
+def add_new_item_sales(dialect):
+    return add_item_sales(
+        dialect, "NEW", '"order".timestamp', '"order" WHERE "order".id = NEW.order_id'
+    )
+
+
+def remove_item_sales(dialect):
+    """Return the statements removing the ``OLD`` order item from the
+    product sales rollups, dropping the rows left without items."""
+    statements = []
+    for table, grain in SALES_ROLLUPS.items():
+        bucket = SALES_BUCKETS[dialect][grain].format('"order".timestamp')
+        match = (
+            f"product_id = OLD.product_id AND {grain} = "
+            f"""(SELECT {bucket} FROM "order" WHERE "order".id = OLD.order_id)"""
+        )
+        statements += [
+            f"""UPDATE {table}
+            SET items = items - 1,
+                units = units - OLD.quantity,
+                revenue = revenue - OLD.quantity * OLD.unit_price
+            WHERE {match};""",
+            f"DELETE FROM {table} WHERE {match} AND items = 0;",
+        ]
+    return statements
+
+
+def move_order_sales(dialect):
+    """Return the statements moving the items of an order from the day and
+    month of its ``OLD`` timestamp to those of its ``NEW`` one."""
+    statements = []
+    for table, grain in SALES_ROLLUPS.items():
+        bucket = SALES_BUCKETS[dialect][grain].format("OLD.timestamp")
+        statements += [
+            f"""UPDATE {table}
+            SET items = items - 1,
+                units = units - order_item.quantity,
+                revenue = revenue - order_item.quantity * order_item.unit_price
+            FROM order_item
+            WHERE order_item.order_id = OLD.id
+                AND {table}.product_id = order_item.product_id
+                AND {table}.{grain} = {bucket};""",
+            f"DELETE FROM {table} WHERE {grain} = {bucket} AND items = 0;",
+        ]
+    return statements + add_item_sales(
+        dialect,
+        "order_item",
+        "NEW.timestamp",
+        "order_item WHERE order_item.order_id = NEW.id",
+    )
+
+
+ADD_CUSTOMER_SALES = """INSERT INTO customer_sales (customer_id, orders, revenue)
+            VALUES (NEW.customer_id, 1, NEW.total)
+            ON CONFLICT (customer_id) DO UPDATE
+            SET orders = customer_sales.orders + 1,
+                revenue = customer_sales.revenue + excluded.revenue;"""
+REMOVE_CUSTOMER_SALES = """UPDATE customer_sales
+            SET orders = orders - 1, revenue = revenue - OLD.total
+            WHERE customer_id = OLD.customer_id;"""
+DROP_CUSTOMER_SALES = """DELETE FROM customer_sales
+            WHERE customer_id = OLD.customer_id AND orders = 0;"""
+
+
+def trigger_body(statements):
+    return "\n            ".join(statements)
+
+
+def sqlite_trigger(name, event, table, statements):
+    return f"""CREATE TRIGGER {name} AFTER {event} ON {table}
+        BEGIN
+            {trigger_body(statements)}
+        END"""
+
+
+def sales_triggers(dialect):
+    """Return the DDL keeping the product and customer sales rollups up to
+    date with every change to orders and their items."""
+    if dialect == "sqlite":
+        return [
+            sqlite_trigger(
+                "order_item_insert_sales",
+                "INSERT",
+                "order_item",
+                add_new_item_sales(dialect),
+            ),
+            sqlite_trigger(
+                "order_item_update_sales",
+                "UPDATE OF order_id, product_id, quantity, unit_price",
+                "order_item",
+                remove_item_sales(dialect) + add_new_item_sales(dialect),
+            ),
+            sqlite_trigger(
+                "order_item_delete_sales",
+                "DELETE",
+                "order_item",
+                remove_item_sales(dialect),
+            ),
+            sqlite_trigger(
+                "order_insert_sales", "INSERT", '"order"', [ADD_CUSTOMER_SALES]
+            ),
+            sqlite_trigger(
+                "order_update_sales",
+                "UPDATE OF customer_id, total",
+                '"order"',
+                [REMOVE_CUSTOMER_SALES, ADD_CUSTOMER_SALES, DROP_CUSTOMER_SALES],
+            ),
+            sqlite_trigger(
+                "order_timestamp_sales",
+                "UPDATE OF timestamp",
+                '"order"',
+                move_order_sales(dialect),
+            ),
+            sqlite_trigger(
+                "order_delete_sales",
+                "DELETE",
+                '"order"',
+                [REMOVE_CUSTOMER_SALES, DROP_CUSTOMER_SALES],
+            ),
+        ]
+    return [
+        f"""CREATE OR REPLACE FUNCTION order_item_sales() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            {trigger_body(remove_item_sales(dialect))}
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            {trigger_body(add_new_item_sales(dialect))}
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql""",
+        """CREATE TRIGGER order_item_sales
+        AFTER INSERT OR UPDATE OF order_id, product_id, quantity, unit_price
+            OR DELETE ON order_item
+        FOR EACH ROW EXECUTE FUNCTION order_item_sales()""",
+        f"""CREATE OR REPLACE FUNCTION order_sales() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND NEW.timestamp <> OLD.timestamp THEN
+            {trigger_body(move_order_sales(dialect))}
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            {REMOVE_CUSTOMER_SALES}
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            {ADD_CUSTOMER_SALES}
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            {DROP_CUSTOMER_SALES}
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql""",
+        """CREATE TRIGGER order_sales
+        AFTER INSERT OR UPDATE OF timestamp, customer_id, total OR DELETE ON "order"
+        FOR EACH ROW EXECUTE FUNCTION order_sales()""",
+    ]
+
+
+for dialect in SALES_BUCKETS:
+    for statement in sales_triggers(dialect):
+        event.listen(
+            db.Model.metadata,
+            "after_create",
+            DDL(statement).execute_if(dialect=dialect),
+        )
+
+
+RATINGS = range(1, 6)
+
+
+def change_rating(row, sign):
+    """Return the update adding (``sign`` "+") or removing (``sign`` "-")
+    the rating of the review ``row`` to the aggregates of its product."""
+    histogram = ",\n                ".join(
+        f"rating_{n} = rating_{n} {sign} CASE WHEN {row}.rating = {n} THEN 1 ELSE 0 END"
+        for n in RATINGS
+    )
+    return f"""UPDATE product
+            SET rating_count = rating_count {sign} 1,
+                rating_sum = rating_sum {sign} {row}.rating,
+                rating_average = CAST(rating_sum {sign} {row}.rating AS FLOAT)
+                    / NULLIF(rating_count {sign} 1, 0),
+                {histogram}
+            WHERE id = {row}.product_id;"""
+
+
+PRODUCT_RATING_TRIGGERS = {
+    "sqlite": [
+        sqlite_trigger(
+            "product_review_insert_ratings",
+            "INSERT",
+            "product_review",
+            [change_rating("NEW", "+")],
+        ),
+        sqlite_trigger(
+            "product_review_update_ratings",
+            "UPDATE OF product_id, rating",
+            "product_review",
+            [change_rating("OLD", "-"), change_rating("NEW", "+")],
+        ),
+        sqlite_trigger(
+            "product_review_delete_ratings",
+            "DELETE",
+            "product_review",
+            [change_rating("OLD", "-")],
+        ),
+    ],
+    "postgresql": [
+        f"""CREATE OR REPLACE FUNCTION product_review_ratings() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            {change_rating("OLD", "-")}
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            {change_rating("NEW", "+")}
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql""",
+        """CREATE TRIGGER product_review_ratings
+        AFTER INSERT OR UPDATE OF product_id, rating OR DELETE ON product_review
+        FOR EACH ROW EXECUTE FUNCTION product_review_ratings()""",
+    ],
+}
+
+for dialect, statements in PRODUCT_RATING_TRIGGERS.items():
+    for statement in statements:
+        event.listen(
+            ProductReview.__table__,
+            "after_create",
+            DDL(statement).execute_if(dialect=dialect),
+        )
@@ -0,0 +1,69 @@
+import base64
+import json
+import math
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import and_, or_
+
+
+def _dump(value):
+    if isinstance(value, datetime):
+        return {"d": value.isoformat()}
+    if isinstance(value, UUID):
+        return {"u": value.hex}
+    return value
+
+
+def _load(value):
+    if isinstance(value, dict):
+        if "d" in value:
+            return datetime.fromisoformat(value["d"])
+        if "u" in value:
+            return UUID(value["u"])
+        raise ValueError("Invalid cursor value")
+    return value
+
+
+def encode_cursor(sort, values):
+    payload = json.dumps({"s": sort or "", "v": [_dump(v) for v in values]})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _coerce(value, python_type):
+    if python_type is float and type(value) is int:
+        value = float(value)
+    if not isinstance(value, python_type):
+        raise ValueError("Invalid cursor value")
+    if python_type is float and not math.isfinite(value):
+        raise ValueError("Invalid cursor value")
+    return value
+
+
+def decode_cursor(cursor, sort, types):
+    """Return the values encoded in ``cursor`` as the python ``types`` of
+    the columns they continue from, raising ``ValueError`` for a cursor of
+    another sort or with values of other types."""
+    try:
+        payload = json.loads(
+            base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        )
+        if not isinstance(payload, dict) or not isinstance(payload.get("v"), list):
+            raise ValueError("Invalid cursor payload")
+        values = [_load(v) for v in payload["v"]]
+        cursor_sort = payload["s"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if cursor_sort != (sort or "") or len(values) != len(types):
+        raise ValueError("Cursor does not match the requested sort")
+    return [_coerce(value, python_type) for value, python_type in zip(values, types)]
+
+
+def keyset_condition(columns, descending, values):
+    """Return a condition selecting the rows that sort after ``values``."""
+    clauses = []
+    for i, (column, desc, value) in enumerate(zip(columns, descending, values)):
+        seek = column < value if desc else column > value
+        clauses.append(and_(*[c == v for c, v in zip(columns[:i], values[:i])], seek))
+    first = columns[0] <= values[0] if descending[0] else columns[0] >= values[0]
+    return and_(first, or_(*clauses))
@@ -0,0 +1,161 @@
+import asyncio
+import csv
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from time import monotonic
+from uuid import UUID, uuid4
+
+
+class Progress:
+    """Print the rows done so far and the rate they are done at, at most
+    once every ``interval`` seconds."""
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.rows = 0
+        self.started = self.printed = monotonic()
+
+    @property
+    def rate(self):
+        return self.rows / max(monotonic() - self.started, 1e-9)
+
+    def add(self, rows):
+        self.rows += rows
+        if monotonic() - self.printed >= self.interval:
+            self.print()
+
+    def print(self):
+        self.printed = monotonic()
+        print(f"{self.rows} rows, {self.rate:.0f} rows/s")
+
+
+def parse_timestamp(value):
+    return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+
+
+def read_chunks(f, size):
+    """Yield the records of a CSV file in lists of up to ``size`` lines of
+    text, keeping quoted fields that span lines in one record."""
+    chunk = []
+    record = ""
+    for line in f:
+        record += line
+        if record.count('"') % 2:
+            continue
+        chunk.append(record)
+        record = ""
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if record:
+        chunk.append(record)
+    if chunk:
+        yield chunk
+
+
+def parse_orders(header, lines):
+    customers = {}
+    orders = []
+    order_items = []
+    for row in csv.DictReader(lines, header):
+        customers.setdefault(
+            row["name"], {"address": row["address"], "phone": row["phone"]}
+        )
+        order_id = uuid4()
+        orders.append(
+            {
+                "id": order_id,
+                "timestamp": parse_timestamp(row["timestamp"]),
+                "customer": row["name"],
+            }
+        )
+        for i in (1, 2, 3):
+            if row[f"product{i}"]:
+                order_items.append(
+                    {
+                        "order_id": order_id,
+                        "product": row[f"product{i}"],
+                        "unit_price": float(row[f"unit_price{i}"]),
+                        "quantity": int(row[f"quantity{i}"]),
+                    }
+                )
+    return {"customers": customers, "orders": orders, "order_items": order_items}
+
+
+def parse_reviews(header, lines):
+    return [
+        {
+            "customer": row["customer"],
+            "product": row["product"],
+            "timestamp": parse_timestamp(row["timestamp"]),
+            "rating": int(row["rating"]),
+            "comment": row["comment"] or None,
+        }
+        for row in csv.DictReader(lines, header)
+    ]
+
+
+def parse_views(header, lines):
+    return [
+        {
+            "title": row["title"],
+            "user": UUID(row["user"]),
+            "customer": row["customer"],
+            "session": UUID(row["session"]),
+            "timestamp": parse_timestamp(row["timestamp"]),
+        }
+        for row in csv.DictReader(lines, header)
+    ]
+
+
+async def run_pipeline(path, parse, write, workers=None, chunk_size=5000):
+    """Parse the CSV file at ``path`` in worker processes and pass the
+    results of ``parse`` to the ``write`` coroutine in file order.
+
+    Chunks of ``chunk_size`` lines are parsed ahead of the writer by up to
+    ``workers`` processes, and at most twice that many parsed chunks wait
+    for it, so a slow database holds the parsers back instead of filling
+    memory. Returns the number of rows read.
+    """
+    workers = workers or os.cpu_count()
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(workers * 2)
+    progress = Progress()
+
+    async def produce(executor):
+        try:
+            with open(path, newline="") as f:
+                header = next(csv.reader([f.readline()]))
+                pending = deque()
+                for lines in read_chunks(f, chunk_size):
+                    pending.append(
+                        (
+                            len(lines),
+                            loop.run_in_executor(executor, parse, header, lines),
+                        )
+                    )
+                    if len(pending) >= workers:
+                        count, future = pending.popleft()
+                        await queue.put((count, await future))
+                for count, future in pending:
+                    await queue.put((count, await future))
+        finally:
+            await queue.put(None)
+
+    with ProcessPoolExecutor(
+        workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        producer = asyncio.create_task(produce(executor))
+        try:
+            while (item := await queue.get()) is not None:
+                count, rows = item
+                await write(rows)
+                progress.add(count)
+            await producer
+        finally:
+            producer.cancel()
+    progress.print()
+    return progress.rows
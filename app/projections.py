@@ -0,0 +1,83 @@
+from functools import lru_cache
+
+from app.extensions import db
+from app.models import Customer, Order, OrderItem
+
+ORDER_COLUMNS = (
+    Order.id,
+    Order.timestamp,
+    Order.total,
+    Customer.id.label("customer_id"),
+    Customer.name.label("customer_name"),
+    Customer.address,
+    Customer.phone,
+)
+ORDER_ITEM_COLUMNS = (
+    OrderItem.order_id,
+    OrderItem.product_id,
+    OrderItem.quantity,
+    OrderItem.unit_price,
+)
+
+
+@lru_cache(maxsize=None)
+def order_rows(query):
+    """Select the columns of ``Order.to_dict`` from a ``paginated_orders``
+    query instead of full ``Order`` entities."""
+    return query.with_only_columns(*ORDER_COLUMNS)
+
+
+def order_items(order_ids):
+    return db.select(*ORDER_ITEM_COLUMNS).where(OrderItem.order_id.in_(order_ids))
+
+
+async def order_dicts(session, query, params=None):
+    """Run an ``order_rows`` query and return the orders as the nested dicts
+    ``Order.to_dict`` builds, plus the last row for the next cursor."""
+    orders = (await session.execute(query, params)).all()
+    if not orders:
+        return [], None
+    return await assemble_orders(session, orders), orders[-1]
+
+
+async def stream_order_dicts(session, query, params=None, chunk_size=1000):
+    """Yield the orders of an ``order_rows`` query in lists of up to
+    ``chunk_size`` dicts, reading the rows through a streaming result."""
+    result = await session.stream(
+        query, params, execution_options={"yield_per": chunk_size}
+    )
+    async for orders in result.partitions():
+        yield await assemble_orders(session, orders)
+
+
+async def assemble_orders(session, orders):
+    """Build the dicts of ``Order.to_dict`` for rows of an ``order_rows``
+    query. Products come from the catalog, so only ``order_item`` rows are
+    read for the items."""
+    items = {order.id: [] for order in orders}
+    item_rows = (await session.execute(order_items(items))).all()
+    products = await db.catalog.get_products({row.product_id for row in item_rows})
+    for row in item_rows:
+        items[row.order_id].append(
+            {
+                "product": products[row.product_id],
+                "quantity": row.quantity,
+                "unit_price": row.unit_price,
+            }
+        )
+
+    return [
+        {
+            "id": order.id,
+            "timestamp": order.timestamp.isoformat(),
+            "customer": {
+                "id": order.customer_id.hex,
+                "name": order.customer_name,
+                "address": order.address,
+                "phone": order.phone,
+            },
+            "order_items": items[order.id],
+            "total": order.total,
+        }
+        for order in orders
+    ]
@@ -0,0 +1,52 @@
+from collections import defaultdict
+
+from app.extensions import db
+from app.loading import loading
+
+IN_BATCH_SIZE = 500
+
+
+class KeyResolver:
+    """Map natural keys from import files to rows loaded ahead of time.
+
+    Each ``load`` call fetches the rows of one entity, either with one ``IN``
+    query per batch of keys or with a full scan for small tables. Lookups
+    of keys that were not found are collected and reported together.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.maps = {}
+        self.unknown = defaultdict(set)
+
+    async def load(self, column, keys=None):
+        query = db.select(column.class_).options(*loading("bulk_import"))
+        found = self.maps.setdefault(column, {})
+        if keys is None:
+            for row in await self.session.scalars(query):
+                found[getattr(row, column.key)] = row
+            return found
+
+        keys = [key for key in keys if key not in found]
+        for i in range(0, len(keys), IN_BATCH_SIZE):
+            batch = keys[i : i + IN_BATCH_SIZE]
+            for row in await self.session.scalars(query.where(column.in_(batch))):
+                found[getattr(row, column.key)] = row
+        return found
+
+    def add(self, column, row):
+        self.maps[column][getattr(row, column.key)] = row
+
+    def get(self, column, key, required=True):
+        row = self.maps[column].get(key)
+        if row is None and required:
+            self.unknown[column].add(key)
+        return row
+
+    def report(self):
+        for column, keys in self.unknown.items():
+            print(
+                f"Skipped rows with {len(keys)} unknown "
+                f"{column.class_.__name__}.{column.key} values: "
+                + ", ".join(sorted(keys))
+            )
@@ -0,0 +1,94 @@
+from sqlalchemy import Date, cast, delete, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.models import (
+    ArticleDailyViews,
+    BlogArticle,
+    BlogView,
+    LanguageDailyViews,
+    ProductDailyViews,
+    RollupWatermark,
+)
+
+WATERMARK = "blog_view"
+VIEW_ROLLUPS = {
+    ArticleDailyViews: BlogView.article_id,
+    LanguageDailyViews: BlogArticle.language_id,
+    ProductDailyViews: BlogArticle.product_id,
+}
+upserts = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def view_day(dialect_name):
+    if dialect_name == "sqlite":
+        return func.date(BlogView.timestamp)
+    return cast(BlogView.timestamp, Date)
+
+
+def rollup_views(dialect_name, model, key, first_id, last_id):
+    """Return an upsert adding the views with ids in ``(first_id, last_id]``
+    to the daily counts of ``model``, grouped by ``key``."""
+    day = view_day(dialect_name)
+    views = select(key, day, func.count()).where(
+        BlogView.id > first_id, BlogView.id <= last_id
+    )
+    if key.class_ is BlogArticle:
+        views = views.join(BlogView.article).where(key.isnot(None))
+    views = views.group_by(key, day)
+
+    columns = [column.name for column in model.__table__.primary_key] + ["views"]
+    upsert = upserts[dialect_name](model).from_select(columns, views)
+    return upsert.on_conflict_do_update(
+        index_elements=columns[:-1],
+        set_={"views": model.views + upsert.excluded.views},
+    )
+
+
+async def clear_view_rollups(session):
+    for model in VIEW_ROLLUPS:
+        await session.execute(delete(model))
+    await session.execute(
+        update(RollupWatermark).filter_by(name=WATERMARK).values(last_id=0)
+    )
+
+
+async def refresh_view_rollups(session, full=False):
+    """Add the views newer than the stored watermark to the daily rollups
+    and return how many were added.
+
+    The watermark is the last ``BlogView.id`` rolled up, so views must be
+    committed in id order. If the views were deleted and reloaded, or when
+    ``full`` is set, the rollups are rebuilt from scratch.
+    """
+    dialect_name = session.bind.dialect.name
+    last_id = await session.scalar(select(func.coalesce(func.max(BlogView.id), 0)))
+    watermark = await session.get(RollupWatermark, WATERMARK)
+    if watermark is None:
+        watermark = RollupWatermark(name=WATERMARK, last_id=0)
+        session.add(watermark)
+    if full or last_id < watermark.last_id:
+        await clear_view_rollups(session)
+
+    first_id = watermark.last_id
+    if last_id == first_id:
+        return 0
+    for model, key in VIEW_ROLLUPS.items():
+        await session.execute(rollup_views(dialect_name, model, key, first_id, last_id))
+    watermark.last_id = last_id
+    return await session.scalar(
+        select(func.count()).where(BlogView.id > first_id, BlogView.id <= last_id)
+    )
+
+
+def trending(model, since, until, limit):
+    """Return the keys of ``model`` with the most views between ``since``
+    and ``until``, with their view counts."""
+    key = model.__table__.primary_key.columns[0]
+    views = func.sum(model.views).label("views")
+    return (
+        select(key, views)
+        .where(model.day.between(since, until))
+        .group_by(key)
+        .order_by(views.desc(), key)
+        .limit(limit)
+    )
@@ -0,0 +1,112 @@
+from sqlalchemy import Date, cast, delete, func, insert, select
+
+from app.models import (
+    Country,
+    Customer,
+    CustomerSales,
+    Manufacturer,
+    Order,
+    OrderItem,
+    Product,
+    ProductCountry,
+    ProductDailySales,
+    ProductMonthlySales,
+)
+
+SALES_GRAINS = {
+    "day": (ProductDailySales, ProductDailySales.day),
+    "month": (ProductMonthlySales, ProductMonthlySales.month),
+}
+SALES_DIMENSIONS = {
+    "product": Product,
+    "manufacturer": Manufacturer,
+    "country": Country,
+}
+
+
+def sales_bucket(dialect_name, grain):
+    if dialect_name == "sqlite":
+        if grain == "day":
+            return func.date(Order.timestamp)
+        return func.date(Order.timestamp, "start of month")
+    if grain == "day":
+        return cast(Order.timestamp, Date)
+    return cast(func.date_trunc("month", Order.timestamp), Date)
+
+
+async def rebuild_sales_rollups(session):
+    """Recompute the sales rollups from all orders.
+
+    Triggers keep the rollups up to date as orders change, so this is only
+    needed to drop rounding left by many updates or after writes made with
+    the triggers disabled.
+    """
+    dialect_name = session.bind.dialect.name
+    for grain, (model, period) in SALES_GRAINS.items():
+        bucket = sales_bucket(dialect_name, grain)
+        await session.execute(delete(model))
+        await session.execute(
+            insert(model).from_select(
+                ["product_id", period.key, "items", "units", "revenue"],
+                select(
+                    OrderItem.product_id,
+                    bucket,
+                    func.count(),
+                    func.sum(OrderItem.quantity),
+                    func.sum(OrderItem.quantity * OrderItem.unit_price),
+                )
+                .join(OrderItem.order)
+                .group_by(OrderItem.product_id, bucket),
+            )
+        )
+    await session.execute(delete(CustomerSales))
+    await session.execute(
+        insert(CustomerSales).from_select(
+            ["customer_id", "orders", "revenue"],
+            select(Order.customer_id, func.count(), func.sum(Order.total)).group_by(
+                Order.customer_id
+            ),
+        )
+    )
+
+
+def sales(grain, since, until, by=None):
+    """Return the items, units and revenue of each ``grain`` period between
+    ``since`` and ``until``, per product, manufacturer or country if ``by``
+    names one.
+
+    Products sold in several countries count towards each of them.
+    """
+    model, period = SALES_GRAINS[grain]
+    keys = [period.label("period")]
+    if by is not None:
+        dimension = SALES_DIMENSIONS[by]
+        keys += [dimension.id, dimension.name]
+    revenue = func.sum(model.revenue).label("revenue")
+    query = select(
+        *keys,
+        func.sum(model.items).label("items"),
+        func.sum(model.units).label("units"),
+        revenue,
+    ).where(period.between(since, until))
+    if by in ("product", "manufacturer"):
+        query = query.join(Product, Product.id == model.product_id)
+    if by == "manufacturer":
+        query = query.join(Manufacturer, Manufacturer.id == Product.manufacturer_id)
+    elif by == "country":
+        query = query.join(
+            ProductCountry, ProductCountry.c.product_id == model.product_id
+        ).join(Country, Country.id == ProductCountry.c.country_id)
+    order_by = [period, revenue.desc()] + keys[1:2]
+    return query.group_by(*keys).order_by(*order_by)
+
+
+def top_customers(limit):
+    """Return the ``limit`` customers who spent the most, with their order
+    counts and spend."""
+    return (
+        select(Customer.id, Customer.name, CustomerSales.orders, CustomerSales.revenue)
+        .join(Customer, Customer.id == CustomerSales.customer_id)
+        .order_by(CustomerSales.revenue.desc(), CustomerSales.customer_id.desc())
+        .limit(limit)
+    )
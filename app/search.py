@@ -0,0 +1,145 @@
+from sqlalchemy import DDL, Integer, Uuid, column, event, table, text, union
+
+from app.extensions import db
+from app.models import Customer, Order, OrderItem, Product
+
+search_document = table(
+    "search_document",
+    column("id", Integer),
+    column("customer_id", Uuid),
+    column("product_id", Integer),
+)
+search_index = table("search_index", column("rowid", Integer), column("name"))
+
+
+class SearchBackend:
+    """Resolve a ``LIKE`` pattern, usually a bound parameter, to the ids of
+    the matching orders."""
+
+    def customer_ids(self, pattern):
+        return db.select(Customer.id).where(Customer.name.ilike(pattern))
+
+    def product_ids(self, pattern):
+        return db.select(Product.id).where(Product.name.ilike(pattern))
+
+    def order_ids(self, pattern):
+        return union(
+            db.select(Order.id).where(
+                Order.customer_id.in_(self.customer_ids(pattern))
+            ),
+            db.select(OrderItem.order_id).where(
+                OrderItem.product_id.in_(self.product_ids(pattern))
+            ),
+        )
+
+    async def rebuild(self, session):
+        pass
+
+
+class FTS5SearchBackend(SearchBackend):
+    """Search customer and product names through an FTS5 trigram index.
+
+    Each customer and product gets a row in ``search_document`` whose id is
+    the rowid of its name in the ``search_index`` virtual table. Triggers
+    keep both in sync, and matching names are mapped to orders through the
+    foreign key indexes on ``order`` and ``order_item``.
+    """
+
+    def _documents(self, key, pattern):
+        matches = db.select(search_index.c.rowid).where(
+            search_index.c.name.like(pattern)
+        )
+        return db.select(key).where(search_document.c.id.in_(matches), key.isnot(None))
+
+    def customer_ids(self, pattern):
+        return self._documents(search_document.c.customer_id, pattern)
+
+    def product_ids(self, pattern):
+        return self._documents(search_document.c.product_id, pattern)
+
+    async def rebuild(self, session):
+        for statement in FTS5_REBUILD:
+            await session.execute(text(statement))
+
+
+FTS5_SCHEMA = [
+    """CREATE TABLE search_document (
+        id INTEGER PRIMARY KEY,
+        customer_id CHAR(32) UNIQUE,
+        product_id INTEGER UNIQUE
+    )""",
+    "CREATE VIRTUAL TABLE search_index USING fts5(name, tokenize='trigram')",
+]
+
+FTS5_TRIGGERS = [
+    """CREATE TRIGGER customer_insert_search AFTER INSERT ON customer
+    BEGIN
+        INSERT INTO search_document (customer_id) VALUES (NEW.id);
+        INSERT INTO search_index (rowid, name) VALUES (last_insert_rowid(), NEW.name);
+    END""",
+    """CREATE TRIGGER customer_update_search AFTER UPDATE OF name ON customer
+    BEGIN
+        UPDATE search_index SET name = NEW.name
+        WHERE rowid = (SELECT id FROM search_document WHERE customer_id = NEW.id);
+    END""",
+    """CREATE TRIGGER customer_delete_search AFTER DELETE ON customer
+    BEGIN
+        DELETE FROM search_index
+        WHERE rowid = (SELECT id FROM search_document WHERE customer_id = OLD.id);
+        DELETE FROM search_document WHERE customer_id = OLD.id;
+    END""",
+    """CREATE TRIGGER product_insert_search AFTER INSERT ON product
+    BEGIN
+        INSERT INTO search_document (product_id) VALUES (NEW.id);
+        INSERT INTO search_index (rowid, name) VALUES (last_insert_rowid(), NEW.name);
+    END""",
+    """CREATE TRIGGER product_update_search AFTER UPDATE OF name ON product
+    BEGIN
+        UPDATE search_index SET name = NEW.name
+        WHERE rowid = (SELECT id FROM search_document WHERE product_id = NEW.id);
+    END""",
+    """CREATE TRIGGER product_delete_search AFTER DELETE ON product
+    BEGIN
+        DELETE FROM search_index
+        WHERE rowid = (SELECT id FROM search_document WHERE product_id = OLD.id);
+        DELETE FROM search_document WHERE product_id = OLD.id;
+    END""",
+]
+
+FTS5_REBUILD = [
+    "DELETE FROM search_index",
+    "DELETE FROM search_document",
+    "INSERT INTO search_document (customer_id) SELECT id FROM customer",
+    "INSERT INTO search_document (product_id) SELECT id FROM product",
+    """INSERT INTO search_index (rowid, name)
+    SELECT search_document.id, customer.name FROM search_document
+    JOIN customer ON customer.id = search_document.customer_id""",
+    """INSERT INTO search_index (rowid, name)
+    SELECT search_document.id, product.name FROM search_document
+    JOIN product ON product.id = search_document.product_id""",
+    "INSERT INTO search_index (search_index) VALUES ('optimize')",
+]
+
+for statement in FTS5_SCHEMA + FTS5_TRIGGERS:
+    event.listen(
+        db.Model.metadata,
+        "after_create",
+        DDL(statement).execute_if(dialect="sqlite"),
+    )
+
+event.listen(
+    db.Model.metadata,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS search_index").execute_if(dialect="sqlite"),
+)
+event.listen(
+    db.Model.metadata,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS search_document").execute_if(dialect="sqlite"),
+)
+
+backends = {"sqlite": FTS5SearchBackend}
+
+
+def create_search_backend(dialect_name):
+    return backends.get(dialect_name, SearchBackend)()
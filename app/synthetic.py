@@ -0,0 +1,307 @@
+import csv
+import random
+from collections import Counter, defaultdict
+from datetime import timedelta
+from hashlib import blake2b
+from uuid import UUID
+
+from app.pipeline import parse_timestamp
+
+CUSTOMERS = 2754
+ORIGINAL_ARTICLES = 143
+AUTHORS = 16
+BLOG_USERS = 500
+CUSTOMER_BLOG_USERS = 0.3
+SESSIONS_PER_USER = {1: 40, 2: 25, 3: 15, 4: 10, 6: 6, 10: 4}
+VIEWS_PER_SESSION = range(1, 10)
+REVIEW_DELAY = timedelta(days=60)
+TRANSLATION_DELAY = timedelta(days=30)
+
+_profile = None
+
+
+def unique_name(pool, index):
+    name = pool[index % len(pool)]
+    return name if index < len(pool) else f"{name} {index // len(pool) + 1}"
+
+
+def stable_uuid(seed, kind, index):
+    digest = blake2b(f"{seed}:{kind}:{index}".encode(), digest_size=16).digest()
+    return UUID(bytes=digest, version=4)
+
+
+def random_uuid(rnd):
+    return UUID(int=rnd.getrandbits(128), version=4)
+
+
+def random_timestamp(rnd, start, end):
+    return start + timedelta(seconds=rnd.randrange(int((end - start).total_seconds())))
+
+
+class Weights:
+    """Draw values with the frequencies they were counted with."""
+
+    def __init__(self, counts):
+        self.values = list(counts)
+        self.weights = list(counts.values())
+
+    def draw(self, rnd):
+        return rnd.choices(self.values, self.weights)[0]
+
+
+class Profile:
+    """Distributions of the CSVs in ``data/`` that synthetic rows follow.
+
+    The blog has no view data to measure, so the shape of views per user
+    and per session comes from the constants at the top of this module.
+    """
+
+    def __init__(self, path, product_ids):
+        with open(f"{path}/orders.csv") as f:
+            orders = list(csv.DictReader(f))
+        with open(f"{path}/reviews.csv") as f:
+            reviews = list(csv.DictReader(f))
+        with open(f"{path}/articles.csv") as f:
+            articles = list(csv.DictReader(f))
+
+        customers = {}
+        prices = defaultdict(list)
+        popularity = Counter()
+        item_counts = Counter()
+        quantities = Counter()
+        bought = set()
+        for row in orders:
+            customers.setdefault(row["name"], (row["address"], row["phone"]))
+            items = [i for i in (1, 2, 3) if row[f"product{i}"]]
+            item_counts[len(items)] += 1
+            for i in items:
+                prices[row[f"product{i}"]].append(float(row[f"unit_price{i}"]))
+                popularity[row[f"product{i}"]] += 1
+                quantities[int(row[f"quantity{i}"])] += 1
+                bought.add((row["name"], row[f"product{i}"]))
+
+        self.names = list(customers)
+        self.contacts = list(customers.values())
+        self.orders_per_customer = Weights(
+            Counter(Counter(row["name"] for row in orders).values())
+        )
+        self.items_per_order = Weights(item_counts)
+        self.quantities = Weights(quantities)
+        self.prices = {
+            product_ids[name]: (min(values), max(values))
+            for name, values in prices.items()
+            if name in product_ids
+        }
+        self.products = Weights(
+            {
+                product_ids[name]: n
+                for name, n in popularity.items()
+                if name in product_ids
+            }
+        )
+        timestamps = [parse_timestamp(row["timestamp"]) for row in orders]
+        self.order_period = (min(timestamps), max(timestamps))
+
+        self.review_rate = len(reviews) / len(bought)
+        self.ratings = Weights(Counter(int(row["rating"]) for row in reviews))
+        self.comments = [row["comment"] for row in reviews if row["comment"]]
+        self.comment_rate = len(self.comments) / len(reviews)
+
+        originals = [row for row in articles if not row["translation_of"]]
+        translations = Counter(row["translation_of"] for row in articles)
+        self.titles = [row["title"] for row in articles]
+        self.authors = sorted({row["author"] for row in articles})
+        self.languages = sorted({row["language"] for row in articles})
+        self.original_languages = Weights(Counter(row["language"] for row in originals))
+        self.translation_languages = Counter(
+            row["language"] for row in articles if row["translation_of"]
+        )
+        self.translations_per_article = Weights(
+            Counter(translations[row["title"]] for row in originals)
+        )
+        self.product_rate = sum(1 for row in originals if row["product"]) / len(
+            originals
+        )
+        timestamps = [parse_timestamp(row["timestamp"]) for row in articles]
+        self.article_period = (min(timestamps), max(timestamps))
+
+    def translation_languages_for(self, rnd, language, count):
+        languages = {
+            name: weight
+            for name, weight in self.translation_languages.items()
+            if name != language
+        }
+        chosen = []
+        while languages and len(chosen) < count:
+            name = Weights(languages).draw(rnd)
+            chosen.append(name)
+            del languages[name]
+        return chosen
+
+
+def init_worker(profile):
+    global _profile
+    _profile = profile
+
+
+def customer_chunk(seed, start, stop):
+    """Return the customers with indexes in ``[start, stop)`` with their
+    orders, order items and reviews."""
+    profile = _profile
+    rnd = random.Random(f"{seed}:customer:{start}")
+    rows = {"customer": [], "order": [], "order_item": [], "product_review": []}
+    for index in range(start, stop):
+        customer_id = stable_uuid(seed, "customer", index)
+        address, phone = rnd.choice(profile.contacts)
+        rows["customer"].append(
+            {
+                "id": customer_id,
+                "name": unique_name(profile.names, index),
+                "address": address,
+                "phone": phone,
+            }
+        )
+        bought = {}
+        for _ in range(profile.orders_per_customer.draw(rnd)):
+            order_id = random_uuid(rnd)
+            timestamp = random_timestamp(rnd, *profile.order_period)
+            rows["order"].append(
+                {"id": order_id, "timestamp": timestamp, "customer_id": customer_id}
+            )
+            count = profile.items_per_order.draw(rnd)
+            products = {}
+            while len(products) < count:
+                products[profile.products.draw(rnd)] = None
+            for product_id in products:
+                low, high = profile.prices[product_id]
+                rows["order_item"].append(
+                    {
+                        "order_id": order_id,
+                        "product_id": product_id,
+                        "unit_price": round(rnd.uniform(low, high), 2),
+                        "quantity": profile.quantities.draw(rnd),
+                    }
+                )
+                bought.setdefault(product_id, timestamp)
+        for product_id, timestamp in bought.items():
+            if rnd.random() >= profile.review_rate:
+                continue
+            comment = None
+            if rnd.random() < profile.comment_rate:
+                comment = rnd.choice(profile.comments)
+            rows["product_review"].append(
+                {
+                    "product_id": product_id,
+                    "customer_id": customer_id,
+                    "timestamp": random_timestamp(
+                        rnd, timestamp, timestamp + REVIEW_DELAY
+                    ),
+                    "rating": profile.ratings.draw(rnd),
+                    "comment": comment,
+                }
+            )
+    return rows
+
+
+def article_chunk(seed, start, stop):
+    """Return the original articles with indexes in ``[start, stop)``, their
+    translations and their authors.
+
+    Author and article ids are numbered from 1 within the chunk, and must
+    be shifted past the rows of earlier chunks before they are inserted.
+    """
+    profile = _profile
+    rnd = random.Random(f"{seed}:article:{start}")
+    authors = max((stop - start) * AUTHORS // ORIGINAL_ARTICLES, 1)
+    rows = {
+        "blog_author": [
+            {"id": i + 1, "name": unique_name(profile.authors, start + i)}
+            for i in range(authors)
+        ],
+        "blog_article": [],
+    }
+    slots = max(profile.translations_per_article.values) + 1
+
+    def add_article(index, **kwargs):
+        article = {
+            "id": len(rows["blog_article"]) + 1,
+            "title": unique_name(profile.titles, index),
+            "translation_of_id": None,
+            **kwargs,
+        }
+        rows["blog_article"].append(article)
+        return article
+
+    for index in range(start, stop):
+        language = profile.original_languages.draw(rnd)
+        product_id = None
+        if rnd.random() < profile.product_rate:
+            product_id = profile.products.draw(rnd)
+        original = add_article(
+            index * slots,
+            author_id=rnd.randint(1, len(rows["blog_author"])),
+            product_id=product_id,
+            timestamp=random_timestamp(rnd, *profile.article_period),
+            language_id=profile.languages.index(language) + 1,
+        )
+        count = profile.translations_per_article.draw(rnd)
+        languages = profile.translation_languages_for(rnd, language, count)
+        for slot, language in enumerate(languages, 1):
+            add_article(
+                index * slots + slot,
+                author_id=original["author_id"],
+                product_id=product_id,
+                timestamp=random_timestamp(
+                    rnd,
+                    original["timestamp"],
+                    original["timestamp"] + TRANSLATION_DELAY,
+                ),
+                language_id=profile.languages.index(language) + 1,
+                translation_of_id=original["id"],
+            )
+    return rows
+
+
+def blog_user_chunk(seed, start, stop, customers, articles):
+    """Return the blog users with indexes in ``[start, stop)`` with their
+    sessions and views of articles with ids up to ``articles``."""
+    rnd = random.Random(f"{seed}:blog_user:{start}")
+    sessions_per_user = Weights(SESSIONS_PER_USER)
+    rows = {"blog_user": [], "blog_session": [], "blog_view": []}
+    for _ in range(start, stop):
+        user_id = random_uuid(rnd)
+        customer_id = None
+        if customers and rnd.random() < CUSTOMER_BLOG_USERS:
+            customer_id = stable_uuid(seed, "customer", rnd.randrange(customers))
+        rows["blog_user"].append({"id": user_id, "customer_id": customer_id})
+        for _ in range(sessions_per_user.draw(rnd)):
+            session_id = random_uuid(rnd)
+            rows["blog_session"].append({"id": session_id, "user_id": user_id})
+            timestamp = random_timestamp(rnd, *_profile.order_period)
+            for _ in range(rnd.choice(VIEWS_PER_SESSION)):
+                timestamp += timedelta(seconds=rnd.randint(10, 600))
+                rows["blog_view"].append(
+                    {
+                        # older articles have had more time to collect views
+                        "article_id": int(articles * rnd.random() ** 2) + 1,
+                        "session_id": session_id,
+                        "timestamp": timestamp,
+                    }
+                )
+    return rows
+
+
+def chunks(total, size):
+    return [(start, min(start + size, total)) for start in range(0, total, size)]
+
+
+def generate(executor, window, fn, seed, ranges, *args):
+    """Yield the results of ``fn`` for each ``(start, stop)`` range in order,
+    with at most ``window`` ranges generated ahead of the consumer."""
+    pending = []
+    for start, stop in ranges:
+        pending.append(executor.submit(fn, seed, start, stop, *args))
+        if len(pending) >= window:
+            yield pending.pop(0).result()
+    for future in pending:
+        yield future.result()
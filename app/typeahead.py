@@ -0,0 +1,126 @@
+import asyncio
+import re
+import threading
+from bisect import bisect_left, insort
+from time import monotonic
+
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app import changes
+from app.extensions import db
+from app.models import Customer, Product
+
+KINDS = {Customer: "customer", Product: "product"}
+TABLES = {model.__tablename__: kind for model, kind in KINDS.items()}
+WORD = re.compile(r"\w+")
+
+
+def prefix_keys(name):
+    """Return the lowercased name from the start of each of its words, so
+    that typing any word of a name finds it."""
+    name = name.lower()
+    return {name[match.start() :] for match in WORD.finditer(name)} or {name}
+
+
+class Typeahead:
+    """Customer and product names in a sorted list of word prefixes.
+
+    Objects flushed by the ORM are added, renamed or removed when their
+    session commits. Bulk statements on the tables, and writes from other
+    processes after ``ttl`` seconds, make the next lookup reload the index.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self.entries = []
+        self.names = {}
+        self.expires = 0
+        self.lock = threading.Lock()
+        changes.subscribe(self._after_commit, "typeahead")
+
+    def warm(self):
+        """Load the index now, unless the database has no tables yet."""
+        try:
+            asyncio.run(self.refresh())
+        except DBAPIError:
+            pass
+
+    async def refresh(self):
+        async with db.Session() as session:
+            rows = [
+                (kind, id, name)
+                for model, kind in KINDS.items()
+                for id, name in await session.execute(db.select(model.id, model.name))
+            ]
+        entries = sorted(
+            (key, kind, id) for kind, id, name in rows for key in prefix_keys(name)
+        )
+        with self.lock:
+            self.entries = entries
+            self.names = {(kind, id): name for kind, id, name in rows}
+            self.expires = monotonic() + self.ttl
+
+    async def suggest(self, prefix, limit=10):
+        """Return up to ``limit`` customers and products with a word of
+        their name starting with ``prefix``, in the order of those words."""
+        if monotonic() >= self.expires:
+            await self.refresh()
+        prefix = prefix.lower()
+        found = {}
+        with self.lock:
+            i = bisect_left(self.entries, (prefix,))
+            while i < len(self.entries) and len(found) < limit:
+                key, kind, id = self.entries[i]
+                if not key.startswith(prefix):
+                    break
+                found.setdefault((kind, id), self.names[kind, id])
+                i += 1
+        return [
+            {"type": kind, "id": id.hex if kind == "customer" else id, "name": name}
+            for (kind, id), name in found.items()
+        ]
+
+    def _add(self, kind, id, name):
+        self.names[kind, id] = name
+        for key in prefix_keys(name):
+            insort(self.entries, (key, kind, id))
+
+    def _remove(self, kind, id):
+        name = self.names.pop((kind, id), None)
+        if name is None:
+            return
+        for key in prefix_keys(name):
+            i = bisect_left(self.entries, (key, kind, id))
+            if i < len(self.entries) and self.entries[i] == (key, kind, id):
+                del self.entries[i]
+
+    def _after_commit(self, tables, updates):
+        with self.lock:
+            if None in updates:
+                self.expires = 0
+                return
+            for kind, id, name in updates:
+                self._remove(kind, id)
+                if name is not None:
+                    self._add(kind, id, name)
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    updates = session.info.setdefault("typeahead", [])
+    for obj in session.new | session.dirty | session.deleted:
+        kind = KINDS.get(type(obj))
+        if kind is not None and obj.id is not None:
+            name = None if obj in session.deleted else obj.name
+            updates.append((kind, obj.id, name))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _do_orm_execute(orm_execute_state):
+    state = orm_execute_state
+    if state.is_insert or state.is_update or state.is_delete:
+        if state.statement.table.name in TABLES:
+            # the rows written are unknown, so reload the index instead
+            state.session.info.setdefault("typeahead", []).append(None)
@@ -0,0 +1,82 @@
+"""Compare sequential and concurrent count/page queries of /api/orders.
+
+Each sample runs on a fresh event loop, as a Flask async view does, and
+bypasses the result cache. Run from the project root against a filled
+database:
+
+    python benchmarks/orders_queries.py --requests 200
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app import create_app  # noqa: E402
+from app.blueprints.main import count_orders, load_orders  # noqa: E402
+from app.concurrency import gather  # noqa: E402
+from app.models import Order  # noqa: E402
+from app.projections import order_rows  # noqa: E402
+
+QUERIES = [
+    ("", None),
+    ("-timestamp", None),
+    ("+customer", None),
+    ("-total", None),
+    ("", "ami"),
+    ("-timestamp", "john"),
+]
+
+
+async def sequential(total, page, sort, length):
+    return (
+        await count_orders(*total),
+        await load_orders(*page, sort, length),
+    )
+
+
+async def concurrent(total, page, sort, length):
+    return await gather(count_orders(*total), load_orders(*page, sort, length))
+
+
+def measure(path, sort, search, requests, length):
+    total = Order.total_orders(search)
+    query, params = Order.paginated_orders(0, length, sort, search)
+    page = (order_rows(query), params)
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        asyncio.run(path(total, page, sort, length))
+        timings.append((time.perf_counter() - start) * 1000)
+    percentiles = statistics.quantiles(timings, n=100)
+    return percentiles[49], percentiles[98]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--length", type=int, default=10)
+    args = parser.parse_args()
+
+    with create_app().app_context():
+        print(
+            f"{'sort':<12}{'search':<8}{'seq p50':>10}{'p99':>8}{'gather p50':>12}{'p99':>8}"
+        )
+        for sort, search in QUERIES:
+            results = []
+            for path in (sequential, concurrent):
+                results.extend(measure(path, sort, search, args.requests, args.length))
+            print(
+                f"{sort or '-':<12}{search or '-':<8}"
+                f"{results[0]:>10.2f}{results[1]:>8.2f}"
+                f"{results[2]:>12.2f}{results[3]:>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
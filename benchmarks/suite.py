@@ -0,0 +1,324 @@
+"""Benchmark suite for the order listing, serialization and importers.
+
+``run`` fills a temporary SQLite database with the CSVs in ``data/``
+repeated ``--scale`` times, timing every ``flask fake`` command, then
+measures /api/orders and ``to_dict``. ``compare`` reports the metrics of
+a run that are slower than a baseline by more than ``--threshold``:
+
+    python benchmarks/suite.py run --scale 1 --scale 4 -o new.json
+    python benchmarks/suite.py compare base.json new.json --threshold 0.2
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+FAKE_COMMANDS = [
+    ["products", "--bulk"],
+    ["products"],
+    ["orders", "--bulk"],
+    ["orders"],
+    ["reviews"],
+    ["articles"],
+    ["languages"],
+    ["views", "--bulk"],
+    ["views"],
+]
+SORTS = ["", "+timestamp", "-timestamp", "+customer", "-customer", "+total", "-total"]
+SEARCHES = ["", "ami", "john"]
+
+
+def scale_csv(source, target, scale, suffixed):
+    """Write ``scale`` copies of ``source``, with ``suffixed`` columns made
+    unique in every copy after the first."""
+    with open(source) as f:
+        reader = csv.DictReader(f)
+        fields = reader.fieldnames
+        rows = list(reader)
+    with open(target, "w", newline="") as f:
+        writer = csv.DictWriter(f, fields, quoting=csv.QUOTE_NONNUMERIC)
+        writer.writeheader()
+        for i in range(scale):
+            for row in rows:
+                if i:
+                    row = {
+                        **row,
+                        **{k: f"{row[k]} {i}" for k in suffixed if row[k]},
+                    }
+                writer.writerow(row)
+
+
+def write_views(data, scale, seed=0):
+    """Write a views.csv of blog sessions over the scaled articles."""
+    rnd = random.Random(seed)
+    with open(data / "articles.csv") as f:
+        titles = [row["title"] for row in csv.DictReader(f)]
+    with open(data / "orders.csv") as f:
+        customers = sorted({row["name"] for row in csv.DictReader(f)})
+    users = [
+        (uuid.UUID(int=rnd.getrandbits(128)), rnd.choice(customers + [""]))
+        for _ in range(200 * scale)
+    ]
+    timestamp = datetime(2022, 1, 1)
+    with open(data / "views.csv", "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["user", "session", "customer", "title", "timestamp"])
+        for _ in range(1000 * scale):
+            user, customer = rnd.choice(users)
+            session = uuid.UUID(int=rnd.getrandbits(128))
+            for _ in range(rnd.randint(1, 9)):
+                timestamp += timedelta(seconds=rnd.randint(1, 3600))
+                writer.writerow(
+                    [
+                        user,
+                        session,
+                        customer,
+                        rnd.choice(titles),
+                        f"{timestamp:%Y-%m-%d %H:%M:%S}",
+                    ]
+                )
+
+
+def prepare_data(workdir, scale):
+    data = workdir / "data"
+    data.mkdir()
+    shutil.copy(ROOT / "data" / "products.csv", data)
+    scale_csv(ROOT / "data" / "orders.csv", data / "orders.csv", scale, ["name"])
+    scale_csv(ROOT / "data" / "reviews.csv", data / "reviews.csv", scale, ["customer"])
+    scale_csv(
+        ROOT / "data" / "articles.csv",
+        data / "articles.csv",
+        scale,
+        ["title", "translation_of"],
+    )
+    write_views(data, scale)
+
+
+def run_flask(workdir, env, *args):
+    """Run a flask command in ``workdir`` and return its wall time in
+    seconds and peak RSS in KiB."""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "flask", *args],
+        cwd=workdir,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, ["flask", *args])
+    return {"wall_s": time.perf_counter() - start, "max_rss_kb": usage.ru_maxrss}
+
+
+def percentiles(timings):
+    cuts = statistics.quantiles(timings, n=100)
+    return {
+        "p50_ms": cuts[49],
+        "p90_ms": cuts[89],
+        "p99_ms": cuts[98],
+        "mean_ms": statistics.fmean(timings),
+    }
+
+
+def measure_orders(client, requests):
+    results = {}
+    for sort in SORTS:
+        for search in SEARCHES:
+            url = f"/api/orders?start=0&length=10&sort={sort.replace('+', '%2B')}&search={search}"
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f"{url} returned {response.status}")
+            timings = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                client.get(url)
+                timings.append((time.perf_counter() - start) * 1000)
+            results[f"sort={sort or '-'},search={search or '-'}"] = percentiles(timings)
+    return results
+
+
+def measure_serialization(app, orders, rounds):
+    from app.extensions import db
+    from app.loading import loading
+    from app.models import Order
+
+    async def load():
+        async with db.Session() as session:
+            query = (
+                db.select(Order)
+                .options(*loading("order_listing"))
+                .order_by(Order.timestamp)
+                .limit(orders)
+            )
+            return (await session.scalars(query)).all()
+
+    rows = asyncio.run(load())
+    data = [order.to_dict() for order in rows]
+    to_dict, encode = [], []
+    with app.app_context():
+        for _ in range(rounds):
+            start = time.perf_counter()
+            [order.to_dict() for order in rows]
+            to_dict.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            app.json.response({"data": data})
+            encode.append(time.perf_counter() - start)
+    return {
+        "to_dict_us_per_order": min(to_dict) / len(rows) * 1e6,
+        "json_us_per_order": min(encode) / len(rows) * 1e6,
+    }
+
+
+def run_scale(scale, requests):
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        prepare_data(workdir, scale)
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite+aiosqlite:///{workdir / 'bench.sqlite'}",
+            "FLASK_APP": "app:create_app",
+            "PYTHONPATH": os.pathsep.join(
+                [str(ROOT), os.environ.get("PYTHONPATH", "")]
+            ),
+            "RESULT_CACHE_TTL": "0",
+        }
+        run_flask(workdir, env, "initdb")
+        fake = {
+            " ".join(args): run_flask(workdir, env, "fake", *args)
+            for args in FAKE_COMMANDS
+        }
+
+        os.environ.update(env)
+        sys.path.insert(0, str(ROOT))
+        from app import create_app
+
+        app = create_app()
+        return {
+            "fake": fake,
+            "orders": measure_orders(app.test_client(), requests),
+            "serialization": measure_serialization(app, 500, 5),
+        }
+
+
+def git_revision():
+    result = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    return result.stdout.strip() or None
+
+
+def run(args):
+    import sqlalchemy
+
+    results = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "requests": args.requests,
+        },
+        "results": {},
+    }
+    for scale in args.scale:
+        # app.config reads the environment on import, so each scale needs
+        # a fresh interpreter; the first one runs in this process
+        if len(args.scale) > 1:
+            output = subprocess.run(
+                [
+                    sys.executable,
+                    __file__,
+                    "run",
+                    "--scale",
+                    str(scale),
+                    "--requests",
+                    str(args.requests),
+                    "-o",
+                    "-",
+                ],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            results["results"].update(json.loads(output)["results"])
+        else:
+            results["results"][f"scale={scale}"] = run_scale(scale, args.requests)
+
+    output = json.dumps(results, indent=2)
+    if args.output == "-":
+        print(output)
+    else:
+        Path(args.output).write_text(output + "\n")
+        print(f"Results written to {args.output}")
+
+
+def flatten(results, prefix=""):
+    for key, value in results.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f"{prefix}{key}/")
+        else:
+            yield f"{prefix}{key}", value
+
+
+def compare(args):
+    base = dict(flatten(json.loads(Path(args.base).read_text())["results"]))
+    new = dict(flatten(json.loads(Path(args.new).read_text())["results"]))
+    regressions = 0
+    for key in sorted(base.keys() & new.keys()):
+        if not base[key]:
+            continue
+        change = new[key] / base[key] - 1
+        if change > args.threshold:
+            regressions += 1
+            flag = "REGRESSION"
+        elif change < -args.threshold:
+            flag = "improved"
+        else:
+            continue
+        print(f"{flag:<11}{key:<70}{base[key]:>12.2f}{new[key]:>12.2f}{change:>+9.1%}")
+    print(f"{regressions} regressions over {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(required=True)
+
+    run_parser = subparsers.add_parser("run", help="run the suite")
+    run_parser.add_argument("--scale", type=int, action="append")
+    run_parser.add_argument("--requests", type=int, default=50)
+    run_parser.add_argument("-o", "--output", default="benchmark.json")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = subparsers.add_parser("compare", help="compare two runs")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.1)
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    if args.func is run and not args.scale:
+        args.scale = [1]
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,12 @@ import asyncio
 from logging.config import fileConfig
 
 from alembic import context
-from sqlalchemy import pool
 from sqlalchemy.engine import Connection
-from sqlalchemy.ext.asyncio import async_engine_from_config
 
-from app.extensions import db, engine
+from app import create_app
+from app.extensions import db
+
+app = create_app()
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -24,7 +25,7 @@ if config.config_file_name is not None:
 target_metadata = db.Model.metadata
 
 config.set_main_option(
-    "sqlalchemy.url", engine.url.render_as_string(hide_password=False)
+    "sqlalchemy.url", db.async_engine.url.render_as_string(hide_password=False)
 )
 
 # other values from the config, defined by the needs of env.py,
@@ -33,6 +34,13 @@ config.set_main_option(
 # ... etc.
 
 
+def include_name(name, type_, parent_names):
+    # skip tables created outside the models, like the search index
+    if type_ == "table":
+        return name in target_metadata.tables
+    return True
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -51,6 +59,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -59,7 +68,10 @@ def run_migrations_offline() -> None:
 
 def do_run_migrations(connection: Connection) -> None:
     context.configure(
-        connection=connection, target_metadata=target_metadata, run_as_batch=True
+        connection=connection,
+        target_metadata=target_metadata,
+        run_as_batch=True,
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -72,11 +84,7 @@ async def run_async_migrations() -> None:
 
     """
 
-    connectable = async_engine_from_config(
-        config.get_section(config.config_ini_section, {}),
-        prefix="sqlalchemy.",
-        poolclass=pool.NullPool,
-    )
+    connectable = db.async_engine
 
     async with connectable.connect() as connection:
         await connection.run_sync(do_run_migrations)
@@ -0,0 +1,358 @@
+"""sales rollups
+
+Revision ID: 3593e705811b
+Revises: 24197c90c16c
+Create Date: 2026-10-17 03:24:07.957646
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3593e705811b'
+down_revision: Union[str, None] = '24197c90c16c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+triggers = {
+    'sqlite': [
+        '''CREATE TRIGGER order_item_insert_sales AFTER INSERT ON order_item
+        BEGIN
+            INSERT INTO product_daily_sales (product_id, day, items, units, revenue)
+            SELECT NEW.product_id, date("order".timestamp),
+                1, NEW.quantity, NEW.quantity * NEW.unit_price
+            FROM "order" WHERE "order".id = NEW.order_id
+            ON CONFLICT (product_id, day) DO UPDATE
+            SET items = product_daily_sales.items + excluded.items,
+                units = product_daily_sales.units + excluded.units,
+                revenue = product_daily_sales.revenue + excluded.revenue;
+            INSERT INTO product_monthly_sales (product_id, month, items, units, revenue)
+            SELECT NEW.product_id, date("order".timestamp, 'start of month'),
+                1, NEW.quantity, NEW.quantity * NEW.unit_price
+            FROM "order" WHERE "order".id = NEW.order_id
+            ON CONFLICT (product_id, month) DO UPDATE
+            SET items = product_monthly_sales.items + excluded.items,
+                units = product_monthly_sales.units + excluded.units,
+                revenue = product_monthly_sales.revenue + excluded.revenue;
+        END''',
+        '''CREATE TRIGGER order_item_update_sales AFTER UPDATE OF order_id, product_id, quantity, unit_price ON order_item
+        BEGIN
+            UPDATE product_daily_sales
+            SET items = items - 1,
+                units = units - OLD.quantity,
+                revenue = revenue - OLD.quantity * OLD.unit_price
+            WHERE product_id = OLD.product_id AND day = (SELECT date("order".timestamp) FROM "order" WHERE "order".id = OLD.order_id);
+            DELETE FROM product_daily_sales WHERE product_id = OLD.product_id AND day = (SELECT date("order".timestamp) FROM "order" WHERE "order".id = OLD.order_id) AND items = 0;
+            UPDATE product_monthly_sales
+            SET items = items - 1,
+                units = units - OLD.quantity,
+                revenue = revenue - OLD.quantity * OLD.unit_price
+            WHERE product_id = OLD.product_id AND month = (SELECT date("order".timestamp, 'start of month') FROM "order" WHERE "order".id = OLD.order_id);
+            DELETE FROM product_monthly_sales WHERE product_id = OLD.product_id AND month = (SELECT date("order".timestamp, 'start of month') FROM "order" WHERE "order".id = OLD.order_id) AND items = 0;
+            INSERT INTO product_daily_sales (product_id, day, items, units, revenue)
+            SELECT NEW.product_id, date("order".timestamp),
+                1, NEW.quantity, NEW.quantity * NEW.unit_price
+            FROM "order" WHERE "order".id = NEW.order_id
+            ON CONFLICT (product_id, day) DO UPDATE
+            SET items = product_daily_sales.items + excluded.items,
+                units = product_daily_sales.units + excluded.units,
+                revenue = product_daily_sales.revenue + excluded.revenue;
+            INSERT INTO product_monthly_sales (product_id, month, items, units, revenue)
+            SELECT NEW.product_id, date("order".timestamp, 'start of month'),
+                1, NEW.quantity, NEW.quantity * NEW.unit_price
+            FROM "order" WHERE "order".id = NEW.order_id
+            ON CONFLICT (product_id, month) DO UPDATE
+            SET items = product_monthly_sales.items + excluded.items,
+                units = product_monthly_sales.units + excluded.units,
+                revenue = product_monthly_sales.revenue + excluded.revenue;
+        END''',
+        '''CREATE TRIGGER order_item_delete_sales AFTER DELETE ON order_item
+        BEGIN
+            UPDATE product_daily_sales
+            SET items = items - 1,
+                units = units - OLD.quantity,
+                revenue = revenue - OLD.quantity * OLD.unit_price
+            WHERE product_id = OLD.product_id AND day = (SELECT date("order".timestamp) FROM "order" WHERE "order".id = OLD.order_id);
+            DELETE FROM product_daily_sales WHERE product_id = OLD.product_id AND day = (SELECT date("order".timestamp) FROM "order" WHERE "order".id = OLD.order_id) AND items = 0;
+            UPDATE product_monthly_sales
+            SET items = items - 1,
+                units = units - OLD.quantity,
+                revenue = revenue - OLD.quantity * OLD.unit_price
+            WHERE product_id = OLD.product_id AND month = (SELECT date("order".timestamp, 'start of month') FROM "order" WHERE "order".id = OLD.order_id);
+            DELETE FROM product_monthly_sales WHERE product_id = OLD.product_id AND month = (SELECT date("order".timestamp, 'start of month') FROM "order" WHERE "order".id = OLD.order_id) AND items = 0;
+        END''',
+        '''CREATE TRIGGER order_insert_sales AFTER INSERT ON "order"
+        BEGIN
+            INSERT INTO customer_sales (customer_id, orders, revenue)
+            VALUES (NEW.customer_id, 1, NEW.total)
+            ON CONFLICT (customer_id) DO UPDATE
+            SET orders = customer_sales.orders + 1,
+                revenue = customer_sales.revenue + excluded.revenue;
+        END''',
+        '''CREATE TRIGGER order_update_sales AFTER UPDATE OF customer_id, total ON "order"
+        BEGIN
+            UPDATE customer_sales
+            SET orders = orders - 1, revenue = revenue - OLD.total
+            WHERE customer_id = OLD.customer_id;
+            INSERT INTO customer_sales (customer_id, orders, revenue)
+            VALUES (NEW.customer_id, 1, NEW.total)
+            ON CONFLICT (customer_id) DO UPDATE
+            SET orders = customer_sales.orders + 1,
+                revenue = customer_sales.revenue + excluded.revenue;
+            DELETE FROM customer_sales
+            WHERE customer_id = OLD.customer_id AND orders = 0;
+        END''',
+        '''CREATE TRIGGER order_timestamp_sales AFTER UPDATE OF timestamp ON "order"
+        BEGIN
+            UPDATE product_daily_sales
+            SET items = items - 1,
+                units = units - order_item.quantity,
+                revenue = revenue - order_item.quantity * order_item.unit_price
+            FROM order_item
+            WHERE order_item.order_id = OLD.id
+                AND product_daily_sales.product_id = order_item.product_id
+                AND product_daily_sales.day = date(OLD.timestamp);
+            DELETE FROM product_daily_sales WHERE day = date(OLD.timestamp) AND items = 0;
+            UPDATE product_monthly_sales
+            SET items = items - 1,
+                units = units - order_item.quantity,
+                revenue = revenue - order_item.quantity * order_item.unit_price
+            FROM order_item
+            WHERE order_item.order_id = OLD.id
+                AND product_monthly_sales.product_id = order_item.product_id
+                AND product_monthly_sales.month = date(OLD.timestamp, 'start of month');
+            DELETE FROM product_monthly_sales WHERE month = date(OLD.timestamp, 'start of month') AND items = 0;
+            INSERT INTO product_daily_sales (product_id, day, items, units, revenue)
+            SELECT order_item.product_id, date(NEW.timestamp),
+                1, order_item.quantity, order_item.quantity * order_item.unit_price
+            FROM order_item WHERE order_item.order_id = NEW.id
+            ON CONFLICT (product_id, day) DO UPDATE
+            SET items = product_daily_sales.items + excluded.items,
+                units = product_daily_sales.units + excluded.units,
+                revenue = product_daily_sales.revenue + excluded.revenue;
+            INSERT INTO product_monthly_sales (product_id, month, items, units, revenue)
+            SELECT order_item.product_id, date(NEW.timestamp, 'start of month'),
+                1, order_item.quantity, order_item.quantity * order_item.unit_price
+            FROM order_item WHERE order_item.order_id = NEW.id
+            ON CONFLICT (product_id, month) DO UPDATE
+            SET items = product_monthly_sales.items + excluded.items,
+                units = product_monthly_sales.units + excluded.units,
+                revenue = product_monthly_sales.revenue + excluded.revenue;
+        END''',
+        '''CREATE TRIGGER order_delete_sales AFTER DELETE ON "order"
+        BEGIN
+            UPDATE customer_sales
+            SET orders = orders - 1, revenue = revenue - OLD.total
+            WHERE customer_id = OLD.customer_id;
+            DELETE FROM customer_sales
+            WHERE customer_id = OLD.customer_id AND orders = 0;
+        END''',
+    ],
+    'postgresql': [
+        '''CREATE OR REPLACE FUNCTION order_item_sales() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE product_daily_sales
+            SET items = items - 1,
+                units = units - OLD.quantity,
+                revenue = revenue - OLD.quantity * OLD.unit_price
+            WHERE product_id = OLD.product_id AND day = (SELECT CAST("order".timestamp AS DATE) FROM "order" WHERE "order".id = OLD.order_id);
+            DELETE FROM product_daily_sales WHERE product_id = OLD.product_id AND day = (SELECT CAST("order".timestamp AS DATE) FROM "order" WHERE "order".id = OLD.order_id) AND items = 0;
+            UPDATE product_monthly_sales
+            SET items = items - 1,
+                units = units - OLD.quantity,
+                revenue = revenue - OLD.quantity * OLD.unit_price
+            WHERE product_id = OLD.product_id AND month = (SELECT CAST(date_trunc('month', "order".timestamp) AS DATE) FROM "order" WHERE "order".id = OLD.order_id);
+            DELETE FROM product_monthly_sales WHERE product_id = OLD.product_id AND month = (SELECT CAST(date_trunc('month', "order".timestamp) AS DATE) FROM "order" WHERE "order".id = OLD.order_id) AND items = 0;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO product_daily_sales (product_id, day, items, units, revenue)
+            SELECT NEW.product_id, CAST("order".timestamp AS DATE),
+                1, NEW.quantity, NEW.quantity * NEW.unit_price
+            FROM "order" WHERE "order".id = NEW.order_id
+            ON CONFLICT (product_id, day) DO UPDATE
+            SET items = product_daily_sales.items + excluded.items,
+                units = product_daily_sales.units + excluded.units,
+                revenue = product_daily_sales.revenue + excluded.revenue;
+            INSERT INTO product_monthly_sales (product_id, month, items, units, revenue)
+            SELECT NEW.product_id, CAST(date_trunc('month', "order".timestamp) AS DATE),
+                1, NEW.quantity, NEW.quantity * NEW.unit_price
+            FROM "order" WHERE "order".id = NEW.order_id
+            ON CONFLICT (product_id, month) DO UPDATE
+            SET items = product_monthly_sales.items + excluded.items,
+                units = product_monthly_sales.units + excluded.units,
+                revenue = product_monthly_sales.revenue + excluded.revenue;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql''',
+        '''CREATE TRIGGER order_item_sales
+        AFTER INSERT OR UPDATE OF order_id, product_id, quantity, unit_price
+            OR DELETE ON order_item
+        FOR EACH ROW EXECUTE FUNCTION order_item_sales()''',
+        '''CREATE OR REPLACE FUNCTION order_sales() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND NEW.timestamp <> OLD.timestamp THEN
+            UPDATE product_daily_sales
+            SET items = items - 1,
+                units = units - order_item.quantity,
+                revenue = revenue - order_item.quantity * order_item.unit_price
+            FROM order_item
+            WHERE order_item.order_id = OLD.id
+                AND product_daily_sales.product_id = order_item.product_id
+                AND product_daily_sales.day = CAST(OLD.timestamp AS DATE);
+            DELETE FROM product_daily_sales WHERE day = CAST(OLD.timestamp AS DATE) AND items = 0;
+            UPDATE product_monthly_sales
+            SET items = items - 1,
+                units = units - order_item.quantity,
+                revenue = revenue - order_item.quantity * order_item.unit_price
+            FROM order_item
+            WHERE order_item.order_id = OLD.id
+                AND product_monthly_sales.product_id = order_item.product_id
+                AND product_monthly_sales.month = CAST(date_trunc('month', OLD.timestamp) AS DATE);
+            DELETE FROM product_monthly_sales WHERE month = CAST(date_trunc('month', OLD.timestamp) AS DATE) AND items = 0;
+            INSERT INTO product_daily_sales (product_id, day, items, units, revenue)
+            SELECT order_item.product_id, CAST(NEW.timestamp AS DATE),
+                1, order_item.quantity, order_item.quantity * order_item.unit_price
+            FROM order_item WHERE order_item.order_id = NEW.id
+            ON CONFLICT (product_id, day) DO UPDATE
+            SET items = product_daily_sales.items + excluded.items,
+                units = product_daily_sales.units + excluded.units,
+                revenue = product_daily_sales.revenue + excluded.revenue;
+            INSERT INTO product_monthly_sales (product_id, month, items, units, revenue)
+            SELECT order_item.product_id, CAST(date_trunc('month', NEW.timestamp) AS DATE),
+                1, order_item.quantity, order_item.quantity * order_item.unit_price
+            FROM order_item WHERE order_item.order_id = NEW.id
+            ON CONFLICT (product_id, month) DO UPDATE
+            SET items = product_monthly_sales.items + excluded.items,
+                units = product_monthly_sales.units + excluded.units,
+                revenue = product_monthly_sales.revenue + excluded.revenue;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE customer_sales
+            SET orders = orders - 1, revenue = revenue - OLD.total
+            WHERE customer_id = OLD.customer_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO customer_sales (customer_id, orders, revenue)
+            VALUES (NEW.customer_id, 1, NEW.total)
+            ON CONFLICT (customer_id) DO UPDATE
+            SET orders = customer_sales.orders + 1,
+                revenue = customer_sales.revenue + excluded.revenue;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            DELETE FROM customer_sales
+            WHERE customer_id = OLD.customer_id AND orders = 0;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql''',
+        '''CREATE TRIGGER order_sales
+        AFTER INSERT OR UPDATE OF timestamp, customer_id, total OR DELETE ON "order"
+        FOR EACH ROW EXECUTE FUNCTION order_sales()''',
+    ],
+}
+
+drop_triggers = {
+    'sqlite': [
+        'DROP TRIGGER order_item_insert_sales',
+        'DROP TRIGGER order_item_update_sales',
+        'DROP TRIGGER order_item_delete_sales',
+        'DROP TRIGGER order_insert_sales',
+        'DROP TRIGGER order_update_sales',
+        'DROP TRIGGER order_timestamp_sales',
+        'DROP TRIGGER order_delete_sales',
+    ],
+    'postgresql': [
+        'DROP TRIGGER order_item_sales ON order_item',
+        'DROP FUNCTION order_item_sales()',
+        'DROP TRIGGER order_sales ON "order"',
+        'DROP FUNCTION order_sales()',
+    ],
+}
+
+backfill = {
+    'sqlite': [
+        '''INSERT INTO product_daily_sales (product_id, day, items, units, revenue)
+        SELECT order_item.product_id, date("order".timestamp), count(*),
+            sum(order_item.quantity), sum(order_item.quantity * order_item.unit_price)
+        FROM order_item JOIN "order" ON "order".id = order_item.order_id
+        GROUP BY 1, 2''',
+        '''INSERT INTO product_monthly_sales (product_id, month, items, units, revenue)
+        SELECT order_item.product_id, date("order".timestamp, 'start of month'), count(*),
+            sum(order_item.quantity), sum(order_item.quantity * order_item.unit_price)
+        FROM order_item JOIN "order" ON "order".id = order_item.order_id
+        GROUP BY 1, 2''',
+        '''INSERT INTO customer_sales (customer_id, orders, revenue)
+        SELECT customer_id, count(*), sum(total) FROM "order" GROUP BY customer_id''',
+    ],
+    'postgresql': [
+        '''INSERT INTO product_daily_sales (product_id, day, items, units, revenue)
+        SELECT order_item.product_id, CAST("order".timestamp AS DATE), count(*),
+            sum(order_item.quantity), sum(order_item.quantity * order_item.unit_price)
+        FROM order_item JOIN "order" ON "order".id = order_item.order_id
+        GROUP BY 1, 2''',
+        '''INSERT INTO product_monthly_sales (product_id, month, items, units, revenue)
+        SELECT order_item.product_id, CAST(date_trunc('month', "order".timestamp) AS DATE), count(*),
+            sum(order_item.quantity), sum(order_item.quantity * order_item.unit_price)
+        FROM order_item JOIN "order" ON "order".id = order_item.order_id
+        GROUP BY 1, 2''',
+        '''INSERT INTO customer_sales (customer_id, orders, revenue)
+        SELECT customer_id, count(*), sum(total) FROM "order" GROUP BY customer_id''',
+    ],
+}
+
+
+def upgrade() -> None:
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('customer_sales',
+    sa.Column('customer_id', sa.Uuid(), nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['customer_id'], ['customer.id'], name=op.f('fk_customer_sales_customer_id_customer')),
+    sa.PrimaryKeyConstraint('customer_id', name=op.f('pk_customer_sales'))
+    )
+    op.create_index('ix_customer_sales_revenue', 'customer_sales', ['revenue', 'customer_id'], unique=False)
+    op.create_table('product_daily_sales',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('items', sa.Integer(), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], name=op.f('fk_product_daily_sales_product_id_product')),
+    sa.PrimaryKeyConstraint('product_id', 'day', name=op.f('pk_product_daily_sales'))
+    )
+    op.create_index(op.f('ix_product_daily_sales_day'), 'product_daily_sales', ['day'], unique=False)
+    op.create_table('product_monthly_sales',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('items', sa.Integer(), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], name=op.f('fk_product_monthly_sales_product_id_product')),
+    sa.PrimaryKeyConstraint('product_id', 'month', name=op.f('pk_product_monthly_sales'))
+    )
+    op.create_index(op.f('ix_product_monthly_sales_month'), 'product_monthly_sales', ['month'], unique=False)
+    # ### end Alembic commands ###
+
+    for statement in backfill.get(op.get_bind().dialect.name, []):
+        op.execute(statement)
+    for statement in triggers.get(op.get_bind().dialect.name, []):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    for statement in drop_triggers.get(op.get_bind().dialect.name, []):
+        op.execute(statement)
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_index(op.f('ix_product_monthly_sales_month'), table_name='product_monthly_sales')
+    op.drop_table('product_monthly_sales')
+    op.drop_index(op.f('ix_product_daily_sales_day'), table_name='product_daily_sales')
+    op.drop_table('product_daily_sales')
+    op.drop_index('ix_customer_sales_revenue', table_name='customer_sales')
+    op.drop_table('customer_sales')
+    # ### end Alembic commands ###
@@ -0,0 +1,110 @@
+"""order totals
+
+Revision ID: 3f1c2a9d7b64
+Revises: 975513b01d78
+Create Date: 2026-10-17 09:12:40.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c2a9d7b64'
+down_revision: Union[str, None] = '975513b01d78'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+triggers = {
+    'sqlite': [
+        '''CREATE TRIGGER order_item_insert_totals AFTER INSERT ON order_item
+        BEGIN
+            UPDATE "order"
+            SET total = total + NEW.quantity * NEW.unit_price,
+                item_count = item_count + 1
+            WHERE id = NEW.order_id;
+        END''',
+        '''CREATE TRIGGER order_item_update_totals
+        AFTER UPDATE OF order_id, quantity, unit_price ON order_item
+        BEGIN
+            UPDATE "order"
+            SET total = total - OLD.quantity * OLD.unit_price,
+                item_count = item_count - 1
+            WHERE id = OLD.order_id;
+            UPDATE "order"
+            SET total = total + NEW.quantity * NEW.unit_price,
+                item_count = item_count + 1
+            WHERE id = NEW.order_id;
+        END''',
+        '''CREATE TRIGGER order_item_delete_totals AFTER DELETE ON order_item
+        BEGIN
+            UPDATE "order"
+            SET total = total - OLD.quantity * OLD.unit_price,
+                item_count = item_count - 1
+            WHERE id = OLD.order_id;
+        END''',
+    ],
+    'postgresql': [
+        '''CREATE FUNCTION order_item_totals() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE "order"
+                SET total = total - OLD.quantity * OLD.unit_price,
+                    item_count = item_count - 1
+                WHERE id = OLD.order_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                UPDATE "order"
+                SET total = total + NEW.quantity * NEW.unit_price,
+                    item_count = item_count + 1
+                WHERE id = NEW.order_id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql''',
+        '''CREATE TRIGGER order_item_totals
+        AFTER INSERT OR UPDATE OR DELETE ON order_item
+        FOR EACH ROW EXECUTE FUNCTION order_item_totals()''',
+    ],
+}
+
+drop_triggers = {
+    'sqlite': [
+        'DROP TRIGGER order_item_insert_totals',
+        'DROP TRIGGER order_item_update_totals',
+        'DROP TRIGGER order_item_delete_totals',
+    ],
+    'postgresql': [
+        'DROP TRIGGER order_item_totals ON order_item',
+        'DROP FUNCTION order_item_totals()',
+    ],
+}
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('total', sa.Float(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('item_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index(batch_op.f('ix_order_total'), ['total'], unique=False)
+
+    op.execute(
+        'UPDATE "order" SET '
+        'total = coalesce((SELECT sum(quantity * unit_price) FROM order_item '
+        'WHERE order_item.order_id = "order".id), 0), '
+        'item_count = (SELECT count(*) FROM order_item '
+        'WHERE order_item.order_id = "order".id)'
+    )
+    for statement in triggers.get(op.get_bind().dialect.name, []):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    for statement in drop_triggers.get(op.get_bind().dialect.name, []):
+        op.execute(statement)
+
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_order_total'))
+        batch_op.drop_column('item_count')
+        batch_op.drop_column('total')
@@ -0,0 +1,88 @@
+"""order search index
+
+Revision ID: 8a4e6d2c1f90
+Revises: 3f1c2a9d7b64
+Create Date: 2026-10-17 10:03:27.551842
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a4e6d2c1f90'
+down_revision: Union[str, None] = '3f1c2a9d7b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+schema = [
+    '''CREATE TABLE search_document (
+        id INTEGER PRIMARY KEY,
+        customer_id CHAR(32) UNIQUE,
+        product_id INTEGER UNIQUE
+    )''',
+    "CREATE VIRTUAL TABLE search_index USING fts5(name, tokenize='trigram')",
+    'INSERT INTO search_document (customer_id) SELECT id FROM customer',
+    'INSERT INTO search_document (product_id) SELECT id FROM product',
+    '''INSERT INTO search_index (rowid, name)
+    SELECT search_document.id, customer.name FROM search_document
+    JOIN customer ON customer.id = search_document.customer_id''',
+    '''INSERT INTO search_index (rowid, name)
+    SELECT search_document.id, product.name FROM search_document
+    JOIN product ON product.id = search_document.product_id''',
+]
+
+triggers = [
+    '''CREATE TRIGGER customer_insert_search AFTER INSERT ON customer
+    BEGIN
+        INSERT INTO search_document (customer_id) VALUES (NEW.id);
+        INSERT INTO search_index (rowid, name) VALUES (last_insert_rowid(), NEW.name);
+    END''',
+    '''CREATE TRIGGER customer_update_search AFTER UPDATE OF name ON customer
+    BEGIN
+        UPDATE search_index SET name = NEW.name
+        WHERE rowid = (SELECT id FROM search_document WHERE customer_id = NEW.id);
+    END''',
+    '''CREATE TRIGGER customer_delete_search AFTER DELETE ON customer
+    BEGIN
+        DELETE FROM search_index
+        WHERE rowid = (SELECT id FROM search_document WHERE customer_id = OLD.id);
+        DELETE FROM search_document WHERE customer_id = OLD.id;
+    END''',
+    '''CREATE TRIGGER product_insert_search AFTER INSERT ON product
+    BEGIN
+        INSERT INTO search_document (product_id) VALUES (NEW.id);
+        INSERT INTO search_index (rowid, name) VALUES (last_insert_rowid(), NEW.name);
+    END''',
+    '''CREATE TRIGGER product_update_search AFTER UPDATE OF name ON product
+    BEGIN
+        UPDATE search_index SET name = NEW.name
+        WHERE rowid = (SELECT id FROM search_document WHERE product_id = NEW.id);
+    END''',
+    '''CREATE TRIGGER product_delete_search AFTER DELETE ON product
+    BEGIN
+        DELETE FROM search_index
+        WHERE rowid = (SELECT id FROM search_document WHERE product_id = OLD.id);
+        DELETE FROM search_document WHERE product_id = OLD.id;
+    END''',
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for statement in schema + triggers:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for name in ['customer_insert_search', 'customer_update_search',
+                 'customer_delete_search', 'product_insert_search',
+                 'product_update_search', 'product_delete_search']:
+        op.execute(f'DROP TRIGGER {name}')
+    op.execute('DROP TABLE search_index')
+    op.execute('DROP TABLE search_document')
@@ -0,0 +1,173 @@
+"""product ratings
+
+Revision ID: b405bbbbb4d4
+Revises: 3593e705811b
+Create Date: 2026-10-17 03:27:14.359093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b405bbbbb4d4'
+down_revision: Union[str, None] = '3593e705811b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+triggers = {
+    'sqlite': [
+        '''CREATE TRIGGER product_review_insert_ratings AFTER INSERT ON product_review
+        BEGIN
+            UPDATE product
+            SET rating_count = rating_count + 1,
+                rating_sum = rating_sum + NEW.rating,
+                rating_average = CAST(rating_sum + NEW.rating AS FLOAT)
+                    / NULLIF(rating_count + 1, 0),
+                rating_1 = rating_1 + CASE WHEN NEW.rating = 1 THEN 1 ELSE 0 END,
+                rating_2 = rating_2 + CASE WHEN NEW.rating = 2 THEN 1 ELSE 0 END,
+                rating_3 = rating_3 + CASE WHEN NEW.rating = 3 THEN 1 ELSE 0 END,
+                rating_4 = rating_4 + CASE WHEN NEW.rating = 4 THEN 1 ELSE 0 END,
+                rating_5 = rating_5 + CASE WHEN NEW.rating = 5 THEN 1 ELSE 0 END
+            WHERE id = NEW.product_id;
+        END''',
+        '''CREATE TRIGGER product_review_update_ratings AFTER UPDATE OF product_id, rating ON product_review
+        BEGIN
+            UPDATE product
+            SET rating_count = rating_count - 1,
+                rating_sum = rating_sum - OLD.rating,
+                rating_average = CAST(rating_sum - OLD.rating AS FLOAT)
+                    / NULLIF(rating_count - 1, 0),
+                rating_1 = rating_1 - CASE WHEN OLD.rating = 1 THEN 1 ELSE 0 END,
+                rating_2 = rating_2 - CASE WHEN OLD.rating = 2 THEN 1 ELSE 0 END,
+                rating_3 = rating_3 - CASE WHEN OLD.rating = 3 THEN 1 ELSE 0 END,
+                rating_4 = rating_4 - CASE WHEN OLD.rating = 4 THEN 1 ELSE 0 END,
+                rating_5 = rating_5 - CASE WHEN OLD.rating = 5 THEN 1 ELSE 0 END
+            WHERE id = OLD.product_id;
+            UPDATE product
+            SET rating_count = rating_count + 1,
+                rating_sum = rating_sum + NEW.rating,
+                rating_average = CAST(rating_sum + NEW.rating AS FLOAT)
+                    / NULLIF(rating_count + 1, 0),
+                rating_1 = rating_1 + CASE WHEN NEW.rating = 1 THEN 1 ELSE 0 END,
+                rating_2 = rating_2 + CASE WHEN NEW.rating = 2 THEN 1 ELSE 0 END,
+                rating_3 = rating_3 + CASE WHEN NEW.rating = 3 THEN 1 ELSE 0 END,
+                rating_4 = rating_4 + CASE WHEN NEW.rating = 4 THEN 1 ELSE 0 END,
+                rating_5 = rating_5 + CASE WHEN NEW.rating = 5 THEN 1 ELSE 0 END
+            WHERE id = NEW.product_id;
+        END''',
+        '''CREATE TRIGGER product_review_delete_ratings AFTER DELETE ON product_review
+        BEGIN
+            UPDATE product
+            SET rating_count = rating_count - 1,
+                rating_sum = rating_sum - OLD.rating,
+                rating_average = CAST(rating_sum - OLD.rating AS FLOAT)
+                    / NULLIF(rating_count - 1, 0),
+                rating_1 = rating_1 - CASE WHEN OLD.rating = 1 THEN 1 ELSE 0 END,
+                rating_2 = rating_2 - CASE WHEN OLD.rating = 2 THEN 1 ELSE 0 END,
+                rating_3 = rating_3 - CASE WHEN OLD.rating = 3 THEN 1 ELSE 0 END,
+                rating_4 = rating_4 - CASE WHEN OLD.rating = 4 THEN 1 ELSE 0 END,
+                rating_5 = rating_5 - CASE WHEN OLD.rating = 5 THEN 1 ELSE 0 END
+            WHERE id = OLD.product_id;
+        END''',
+    ],
+    'postgresql': [
+        '''CREATE OR REPLACE FUNCTION product_review_ratings() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE product
+            SET rating_count = rating_count - 1,
+                rating_sum = rating_sum - OLD.rating,
+                rating_average = CAST(rating_sum - OLD.rating AS FLOAT)
+                    / NULLIF(rating_count - 1, 0),
+                rating_1 = rating_1 - CASE WHEN OLD.rating = 1 THEN 1 ELSE 0 END,
+                rating_2 = rating_2 - CASE WHEN OLD.rating = 2 THEN 1 ELSE 0 END,
+                rating_3 = rating_3 - CASE WHEN OLD.rating = 3 THEN 1 ELSE 0 END,
+                rating_4 = rating_4 - CASE WHEN OLD.rating = 4 THEN 1 ELSE 0 END,
+                rating_5 = rating_5 - CASE WHEN OLD.rating = 5 THEN 1 ELSE 0 END
+            WHERE id = OLD.product_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            UPDATE product
+            SET rating_count = rating_count + 1,
+                rating_sum = rating_sum + NEW.rating,
+                rating_average = CAST(rating_sum + NEW.rating AS FLOAT)
+                    / NULLIF(rating_count + 1, 0),
+                rating_1 = rating_1 + CASE WHEN NEW.rating = 1 THEN 1 ELSE 0 END,
+                rating_2 = rating_2 + CASE WHEN NEW.rating = 2 THEN 1 ELSE 0 END,
+                rating_3 = rating_3 + CASE WHEN NEW.rating = 3 THEN 1 ELSE 0 END,
+                rating_4 = rating_4 + CASE WHEN NEW.rating = 4 THEN 1 ELSE 0 END,
+                rating_5 = rating_5 + CASE WHEN NEW.rating = 5 THEN 1 ELSE 0 END
+            WHERE id = NEW.product_id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql''',
+        '''CREATE TRIGGER product_review_ratings
+        AFTER INSERT OR UPDATE OF product_id, rating OR DELETE ON product_review
+        FOR EACH ROW EXECUTE FUNCTION product_review_ratings()''',
+    ],
+}
+
+drop_triggers = {
+    'sqlite': [
+        'DROP TRIGGER product_review_insert_ratings',
+        'DROP TRIGGER product_review_update_ratings',
+        'DROP TRIGGER product_review_delete_ratings',
+    ],
+    'postgresql': [
+        'DROP TRIGGER product_review_ratings ON product_review',
+        'DROP FUNCTION product_review_ratings()',
+    ],
+}
+
+
+def upgrade() -> None:
+    op.add_column('product', sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('product', sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('product', sa.Column('rating_1', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('product', sa.Column('rating_2', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('product', sa.Column('rating_3', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('product', sa.Column('rating_4', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('product', sa.Column('rating_5', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('product', sa.Column('rating_average', sa.Float(), nullable=True))
+    op.create_index(op.f('ix_product_rating_average'), 'product', ['rating_average'], unique=False)
+
+    op.execute(
+        'UPDATE product SET '
+        'rating_count = (SELECT count(*) FROM product_review '
+        'WHERE product_review.product_id = product.id), '
+        'rating_sum = coalesce((SELECT sum(rating) FROM product_review '
+        'WHERE product_review.product_id = product.id), 0), '
+        'rating_1 = (SELECT count(*) FROM product_review '
+        'WHERE product_review.product_id = product.id AND rating = 1), '
+        'rating_2 = (SELECT count(*) FROM product_review '
+        'WHERE product_review.product_id = product.id AND rating = 2), '
+        'rating_3 = (SELECT count(*) FROM product_review '
+        'WHERE product_review.product_id = product.id AND rating = 3), '
+        'rating_4 = (SELECT count(*) FROM product_review '
+        'WHERE product_review.product_id = product.id AND rating = 4), '
+        'rating_5 = (SELECT count(*) FROM product_review '
+        'WHERE product_review.product_id = product.id AND rating = 5), '
+        'rating_average = (SELECT avg(rating) FROM product_review '
+        'WHERE product_review.product_id = product.id)'
+    )
+    for statement in triggers.get(op.get_bind().dialect.name, []):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    for statement in drop_triggers.get(op.get_bind().dialect.name, []):
+        op.execute(statement)
+
+    op.drop_index(op.f('ix_product_rating_average'), table_name='product')
+    op.drop_column('product', 'rating_average')
+    op.drop_column('product', 'rating_5')
+    op.drop_column('product', 'rating_4')
+    op.drop_column('product', 'rating_3')
+    op.drop_column('product', 'rating_2')
+    op.drop_column('product', 'rating_1')
+    op.drop_column('product', 'rating_sum')
+    op.drop_column('product', 'rating_count')